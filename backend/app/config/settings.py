@@ -9,6 +9,54 @@ load_dotenv(dotenv_path=env_path)
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Routes with at most this many points are solved exactly (Held-Karp)
+EXACT_SOLVER_MAX_STOPS = int(os.getenv("EXACT_SOLVER_MAX_STOPS", "15"))
+
+# Optimized route cache (LRU entries, seconds before an entry expires)
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "256"))
+ROUTE_CACHE_TTL_SECONDS = float(os.getenv("ROUTE_CACHE_TTL_SECONDS", "600"))
+
+# OSRM legs kept between requests (16 bytes each; the default holds a 2000-point matrix)
+LEG_CACHE_SIZE = int(os.getenv("LEG_CACHE_SIZE", "4000000"))
+
+# Shared async OSRM HTTP client: connection pool, keep-alive and request timeout
+OSRM_MAX_CONNECTIONS = int(os.getenv("OSRM_MAX_CONNECTIONS", "32"))
+OSRM_MAX_KEEPALIVE = int(os.getenv("OSRM_MAX_KEEPALIVE", "16"))
+OSRM_KEEPALIVE_SECONDS = float(os.getenv("OSRM_KEEPALIVE_SECONDS", "30"))
+OSRM_TIMEOUT_SECONDS = float(os.getenv("OSRM_TIMEOUT_SECONDS", "10"))
+# Table requests in flight at once per OSRM host (the public server asks for restraint)
+OSRM_LOCAL_CONCURRENCY = int(os.getenv("OSRM_LOCAL_CONCURRENCY", "16"))
+OSRM_PUBLIC_CONCURRENCY = int(os.getenv("OSRM_PUBLIC_CONCURRENCY", "2"))
+# Coordinates per table request (osrm-routed --max-table-size); larger matrices are tiled
+OSRM_LOCAL_MAX_TABLE_SIZE = int(os.getenv("OSRM_LOCAL_MAX_TABLE_SIZE", "100"))
+OSRM_PUBLIC_MAX_TABLE_SIZE = int(os.getenv("OSRM_PUBLIC_MAX_TABLE_SIZE", "100"))
+# Circuit breakers: failures in a row before a backend is skipped, seconds before it is retried,
+# and how often / how patiently skipped backends are health-probed
+OSRM_BREAKER_FAILURES = int(os.getenv("OSRM_BREAKER_FAILURES", "3"))
+OSRM_BREAKER_RESET_SECONDS = float(os.getenv("OSRM_BREAKER_RESET_SECONDS", "30"))
+OSRM_PROBE_INTERVAL_SECONDS = float(os.getenv("OSRM_PROBE_INTERVAL_SECONDS", "10"))
+OSRM_PROBE_TIMEOUT_SECONDS = float(os.getenv("OSRM_PROBE_TIMEOUT_SECONDS", "2"))
+
+# Straight-line cost estimate: detour over great-circle distance and average speed until
+# calibrated from OSRM legs (at least ESTIMATE_MIN_SAMPLES legs of ESTIMATE_MIN_LEG_METERS or more)
+ESTIMATE_DETOUR_FACTOR = float(os.getenv("ESTIMATE_DETOUR_FACTOR", "1.3"))
+ESTIMATE_SPEED_KMH = float(os.getenv("ESTIMATE_SPEED_KMH", "40"))
+ESTIMATE_MIN_LEG_METERS = float(os.getenv("ESTIMATE_MIN_LEG_METERS", "200"))
+ESTIMATE_MIN_SAMPLES = int(os.getenv("ESTIMATE_MIN_SAMPLES", "100"))
+# Solve on estimated costs instead of failing when no OSRM backend answers
+OSRM_ESTIMATE_FALLBACK = os.getenv("OSRM_ESTIMATE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Solvers stop once within this percent of the lower bound (unset = never early)
+TARGET_GAP_PERCENT = float(os.getenv("TARGET_GAP_PERCENT")) if os.getenv("TARGET_GAP_PERCENT") else None
+
+# /route/optimize-batch: routes per request, matrix requests in flight at once
+BATCH_MAX_ROUTES = int(os.getenv("BATCH_MAX_ROUTES", "500"))
+MATRIX_FETCH_CONCURRENCY = int(os.getenv("MATRIX_FETCH_CONCURRENCY", "8"))
+
+# Dedicated solver processes for /route/optimize and how many requests may wait for one
+SOLVER_POOL_WORKERS = int(os.getenv("SOLVER_POOL_WORKERS", str(os.cpu_count() or 1)))
+SOLVER_QUEUE_SIZE = int(os.getenv("SOLVER_QUEUE_SIZE", "16"))
+
 
 if not DEEPSEEK_API_KEY:
     raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
\ No newline at end of file
@@ -4,6 +4,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from app.routes import places, optimize, chat, geocode
 from app.config.logging import logger
+from app.modules.optimization.parallel import shutdown_pool
+from app.services.route_service import solver_pool
+from app.modules.routing.http_client import close_clients, open_client
+from app.services.distance_service import DistanceService
+from app.config.settings import OSRM_PROBE_INTERVAL_SECONDS
+import asyncio
 import os
 
 app = FastAPI()
@@ -25,10 +31,16 @@ app.add_middleware(
 # Lifecycle Hooks
 @app.on_event("startup")
 async def on_startup():
+    await open_client()
+    app.state.osrm_probes = asyncio.create_task(DistanceService.run_health_probes(OSRM_PROBE_INTERVAL_SECONDS))
     logger.info("🔧 Application startup complete")
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    app.state.osrm_probes.cancel()
+    shutdown_pool()
+    solver_pool.shutdown()
+    await close_clients()
     logger.info("🛑 Application shutdown complete")
 
 # Health Check Routes
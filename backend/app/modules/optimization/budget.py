@@ -0,0 +1,42 @@
+import time
+from typing import Optional
+import numpy as np
+
+class SolveBudget:
+    """
+    Wall-clock limit and progress counters for one solver run.
+
+    Solvers poll ``expired()`` between iterations and return their best tour so
+    far once it is true. They add their units of work (improving moves, kicks,
+    generations, DP layers) to ``iterations`` and set ``converged`` when they
+    stop on their own rather than on the deadline. ``cancel`` is an optional
+    one-element array (e.g. in shared memory) that ends the run once non-zero.
+    Solvers that track their best cost also stop once it ``reached`` the
+    ``target_cost`` (e.g. within a gap of a lower bound).
+    """
+
+    def __init__(self, time_limit_ms: Optional[float] = None, cancel: Optional[np.ndarray] = None,
+                 target_cost: Optional[float] = None):
+        self.time_limit_ms = time_limit_ms
+        self.started = time.monotonic()
+        self.deadline = None if time_limit_ms is None else self.started + time_limit_ms / 1000
+        self.cancel = cancel
+        self.target_cost = target_cost
+        self.iterations = 0
+        self.converged = False
+
+    def expired(self) -> bool:
+        if self.cancel is not None and self.cancel[0]:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def reached(self, cost: float) -> bool:
+        return self.target_cost is not None and cost <= self.target_cost
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, (self.deadline - time.monotonic()) * 1000)
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
@@ -0,0 +1,166 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from .budget import SolveBudget
+from .lk import lin_kernighan
+from .local_search import _local_search_descent
+from .parallel import MatrixRef, SharedMatrix, attach_matrix, get_pool
+from .two_opt import _is_symmetric, _movable_range, _neighbor_lists
+
+def cluster_solve(
+    coords: np.ndarray,
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    cluster_size: int = 150,
+    workers: int = 1,
+    neighbor_k: int = 8,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Cluster-first, route-second heuristic for large stop sets.
+
+    Free stops are sorted along a Hilbert curve over their (latitude, longitude)
+    and cut into clusters of about ``cluster_size`` consecutive stops, so the
+    curve also gives a good cluster order. Each cluster is solved as an open
+    path with iterated LK (in ``workers`` processes when > 1) between the
+    closest pair of stops to its neighbors and the paths are chained. A local
+    search over the joined route then repairs the seams; starting from paths
+    that are already locally optimal it converges in a fraction of a full solve.
+    """
+    budget = budget or SolveBudget()
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    n = dist_mx.shape[0]
+    fixed_end = end if end is not None and end != start else None
+    closed = return_to_start
+
+    free = np.array([i for i in range(n) if i != start and i != fixed_end], dtype=np.intp)
+    if len(free) == 0:
+        route = [x for x in (start, fixed_end) if x is not None]
+        budget.converged = True
+        return route + route[:1] if closed else route
+
+    order = free[np.argsort(_hilbert_index(np.asarray(coords, dtype=float)[free]), kind="stable")]
+    k = max(1, int(np.ceil(len(order) / cluster_size)))
+    clusters = [c for c in np.array_split(order, k) if len(c)]
+
+    # Clusters get most of the time left, the seam repair the rest
+    rounds = int(np.ceil(len(clusters) / max(1, workers)))
+    remaining = budget.remaining_ms()
+    cluster_ms = None if remaining is None else 0.8 * remaining / rounds
+
+    gates = _gateways(clusters, dist_mx, start, fixed_end, closed)
+    if workers > 1 and len(clusters) > 1:
+        with SharedMatrix(dist_mx) as shared:
+            futures = [get_pool().submit(_solve_cluster_worker, shared.ref, nodes, entry, exit_, cluster_ms)
+                       for nodes, (entry, exit_) in zip(clusters, gates)]
+            paths = [future.result() for future in futures]
+    else:
+        paths = [_solve_cluster(dist_mx, nodes, entry, exit_, cluster_ms)
+                 for nodes, (entry, exit_) in zip(clusters, gates)]
+    budget.iterations += len(paths)
+
+    tour = ([start] if start is not None else []) + [x for path in paths for x in path]
+    if fixed_end is not None:
+        tour.append(fixed_end)
+    if closed:
+        tour.append(tour[0])
+
+    lo, hi = _movable_range(tour, start, end, return_to_start)
+    if len(tour) > 3 and hi - lo >= 1:
+        _local_search_descent(
+            tour,
+            dist_mx.tolist(),
+            _neighbor_lists(dist_mx, neighbor_k),
+            lo,
+            hi,
+            symmetric=_is_symmetric(dist_mx),
+            max_evals=50 * len(tour),
+            budget=budget
+        )
+    else:
+        budget.converged = True
+    return tour
+
+def _solve_cluster(dist_mx: np.ndarray, nodes: np.ndarray, entry: Optional[int], exit_: Optional[int],
+                   time_limit_ms: Optional[float]) -> List[int]:
+    """Open path through ``nodes`` from ``entry`` to ``exit_``, solved on their submatrix"""
+    if len(nodes) == 1:
+        return nodes.tolist()
+    sub = dist_mx[np.ix_(nodes, nodes)]
+    local = {int(x): i for i, x in enumerate(nodes)}
+    path = lin_kernighan(sub, local.get(entry), local.get(exit_), False, kicks=len(nodes),
+                         seed=0, budget=SolveBudget(time_limit_ms))
+    return nodes[path].tolist()
+
+def _solve_cluster_worker(matrix_ref: MatrixRef, nodes: np.ndarray, entry: Optional[int],
+                          exit_: Optional[int], time_limit_ms: Optional[float]) -> List[int]:
+    """Worker entry point: solve one cluster against the shared matrix"""
+    return _solve_cluster(attach_matrix(matrix_ref), nodes, entry, exit_, time_limit_ms)
+
+def _gateways(clusters: List[np.ndarray], dist_mx: np.ndarray, start: Optional[int],
+              end: Optional[int], closed: bool) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    (entry, exit) stop of each cluster in visiting order: the closest pair of
+    stops between consecutive clusters, ``None`` where a path end is free.
+    """
+    k = len(clusters)
+    gates: List[List[Optional[int]]] = [[None, None] for _ in range(k)]
+
+    def closest(a: int, b: int) -> None:
+        """Link cluster a's exit to cluster b's entry, keeping entry != exit inside each"""
+        src, dst = clusters[a], clusters[b]
+        legs = dist_mx[np.ix_(src, dst)].copy()
+        if gates[a][0] is not None and len(src) > 1:
+            legs[src == gates[a][0], :] = np.inf
+        if gates[b][1] is not None and len(dst) > 1:
+            legs[:, dst == gates[b][1]] = np.inf
+        i, j = np.unravel_index(np.argmin(legs), legs.shape)
+        gates[a][1], gates[b][0] = int(src[i]), int(dst[j])
+
+    def nearest(cluster: int, node: int, side: int) -> None:
+        """Put the stop of ``cluster`` closest to a fixed ``node`` on the given side"""
+        nodes = clusters[cluster]
+        legs = (dist_mx[node, nodes] if side == 0 else dist_mx[nodes, node]).copy()
+        other = gates[cluster][1 - side]
+        if other is not None and len(nodes) > 1:
+            legs[nodes == other] = np.inf
+        gates[cluster][side] = int(nodes[np.argmin(legs)])
+
+    for i in range(k - 1):
+        closest(i, i + 1)
+    if start is not None:
+        nearest(0, start, 0)
+    if end is not None:
+        nearest(k - 1, end, 1)
+    elif closed:
+        if start is not None:
+            nearest(k - 1, start, 1)
+        elif k > 1:
+            closest(k - 1, 0)
+    return [tuple(g) for g in gates]
+
+def _hilbert_index(coords: np.ndarray, bits: int = 16) -> np.ndarray:
+    """Position of each (latitude, longitude) along a Hilbert curve over their bounding box"""
+    lat, lon = coords[:, 0], coords[:, 1]
+    # Degrees of longitude shrink with latitude
+    points = np.column_stack([lon * np.cos(np.radians(lat.mean())), lat])
+    low = points.min(axis=0)
+    span = max(float((points.max(axis=0) - low).max()), 1e-12)
+    side = 1 << bits
+    x, y = ((points - low) / span * (side - 1)).astype(np.int64).T
+
+    d = np.zeros(len(points), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return d
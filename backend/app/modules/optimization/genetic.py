@@ -1,7 +1,7 @@
 import numpy as np
-import random
-from typing import List, Optional, Set
-from .nn import _path_cost
+from typing import List, Optional, Tuple
+from .parallel import MatrixRef, SharedMatrix, attach_matrix, get_pool
+from .budget import SolveBudget
 
 def genetic_tsp(
     dist_mx: np.ndarray,
@@ -11,167 +11,283 @@ def genetic_tsp(
     pop_size: int = 100,
     generations: int = 500,
     mutation_rate: float = 0.2,
-    elite_frac: float = 0.1
+    elite_frac: float = 0.1,
+    seed: Optional[int] = None,
+    budget: Optional[SolveBudget] = None
 ) -> List[int]:
     """
-    Genetic algorithm for TSP with fixed start/end support
+    Genetic algorithm for TSP with fixed start/end support.
+
+    The population is a ``(pop_size, m)`` int32 array holding only the ``m``
+    freely ordered stops of each route; fixed start/end legs are added around it
+    when scoring. Fitness is cached per individual and only computed for new
+    children, in one gather-and-sum. Selection, ordered crossover and swap
+    mutation run batched over all children of a generation. ``seed`` makes runs
+    reproducible; ``budget`` stops the evolution early with the best individual
+    so far, on its deadline or once its target cost is reached.
     """
+    budget = budget or SolveBudget()
+    dist_mx = np.asarray(dist_mx, dtype=float)
     n = dist_mx.shape[0]
-    if n == 0:
-        return []
-    if n == 1:
-        return [0]
-    
+    if n <= 1:
+        budget.converged = True
+        return list(range(n))
+
+    rng = np.random.default_rng(seed)
+    layout = _route_layout(n, start, end, return_to_start)
+    free = layout[1]
+    if len(free) < 2:
+        budget.converged = True
+        return _assemble(layout, free[None, :])[0].tolist()
+
     # Initialize population based on constraints
-    population = _initialize_population(n, start, end, return_to_start, pop_size)
-    elite_count = max(1, int(elite_frac * pop_size))
-    
+    population = _initialize_population(free, pop_size, rng)
+    fitness = _fitness(population, layout, dist_mx)
+    elite_count = min(pop_size, max(1, int(elite_frac * pop_size)))
+
+    population, fitness, done = _evolve(population, fitness, layout, dist_mx, generations,
+                                        mutation_rate, elite_count, rng, budget)
+    budget.iterations += done
+    budget.converged = done == generations or budget.reached(fitness.min())
+
+    # Return best individual
+    best = int(np.argmin(fitness))
+    return _assemble(layout, population[best:best + 1])[0].tolist()
+
+def island_genetic_tsp(
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    workers: int = 4,
+    pop_size: int = 100,
+    generations: int = 500,
+    mutation_rate: float = 0.2,
+    elite_frac: float = 0.1,
+    migration_interval: int = 25,
+    migrants: int = 2,
+    seed: Optional[int] = None,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Island-model genetic algorithm: ``workers`` populations of ``pop_size``
+    evolve in parallel in the shared process pool.
+
+    Every ``migration_interval`` generations each island sends copies of its
+    ``migrants`` best individuals to the next island in a ring, replacing that
+    island's worst. The distance matrix is shared through shared memory, so only
+    the populations travel between processes. Islands get the time left on
+    ``budget`` at every epoch and stop evolving when it runs out.
+    """
+    budget = budget or SolveBudget()
+    if workers <= 1:
+        return genetic_tsp(dist_mx, start, end, return_to_start, pop_size, generations,
+                           mutation_rate, elite_frac, seed, budget)
+
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    n = dist_mx.shape[0]
+    if n <= 1:
+        budget.converged = True
+        return list(range(n))
+
+    layout = _route_layout(n, start, end, return_to_start)
+    free = layout[1]
+    if len(free) < 2:
+        budget.converged = True
+        return _assemble(layout, free[None, :])[0].tolist()
+
+    seeds = np.random.SeedSequence(seed)
+    islands = []
+    for island_seed in seeds.spawn(workers):
+        population = _initialize_population(free, pop_size, np.random.default_rng(island_seed))
+        islands.append((population, _fitness(population, layout, dist_mx)))
+
+    elite_count = min(pop_size, max(1, int(elite_frac * pop_size)))
+    migrants = max(0, min(migrants, pop_size - elite_count))
+    pool = get_pool()
+
+    with SharedMatrix(dist_mx) as shared:
+        done = 0
+        while done < generations and not budget.expired():
+            epoch = min(max(1, migration_interval), generations - done)
+            futures = [
+                pool.submit(_island_epoch, shared.ref, layout, population, fitness, epoch,
+                            mutation_rate, elite_count, island_seed, budget.remaining_ms(),
+                            budget.target_cost)
+                for (population, fitness), island_seed in zip(islands, seeds.spawn(workers))
+            ]
+            results = [future.result() for future in futures]
+            islands = [(population, fitness) for population, fitness, _ in results]
+            done += min(ran for _, _, ran in results)
+            if min(ran for _, _, ran in results) < epoch:
+                break
+            if done < generations and migrants:
+                _migrate(islands, migrants)
+
+    # Return best individual across islands
+    population, fitness = min(islands, key=lambda island: island[1].min())
+    budget.iterations += done
+    budget.converged = done == generations or budget.reached(fitness.min())
+
+    best = int(np.argmin(fitness))
+    return _assemble(layout, population[best:best + 1])[0].tolist()
+
+def _island_epoch(
+    matrix_ref: MatrixRef,
+    layout: Tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+    population: np.ndarray,
+    fitness: np.ndarray,
+    generations: int,
+    mutation_rate: float,
+    elite_count: int,
+    seed: np.random.SeedSequence,
+    time_limit_ms: Optional[float] = None,
+    target_cost: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Worker entry point: evolve one island for up to ``generations`` generations"""
+    dist_mx = attach_matrix(matrix_ref)
+    return _evolve(population, fitness, layout, dist_mx, generations, mutation_rate,
+                   elite_count, np.random.default_rng(seed),
+                   SolveBudget(time_limit_ms, target_cost=target_cost))
+
+def _migrate(islands: List[Tuple[np.ndarray, np.ndarray]], migrants: int) -> None:
+    """Ring migration: each island's best replace the next island's worst, in place"""
+    outgoing = []
+    for population, fitness in islands:
+        best = np.argpartition(fitness, migrants - 1)[:migrants]
+        outgoing.append((population[best].copy(), fitness[best].copy()))
+
+    for i, (population, fitness) in enumerate(islands):
+        incoming, incoming_fitness = outgoing[i - 1]
+        worst = np.argpartition(fitness, len(fitness) - migrants)[-migrants:]
+        population[worst] = incoming
+        fitness[worst] = incoming_fitness
+
+def _evolve(
+    population: np.ndarray,
+    fitness: np.ndarray,
+    layout: Tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+    dist_mx: np.ndarray,
+    generations: int,
+    mutation_rate: float,
+    elite_count: int,
+    rng: np.random.Generator,
+    budget: Optional[SolveBudget] = None
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Run up to ``generations`` generations of elitism + tournament/OX/swap breeding.
+    Returns the population, its fitness and how many generations ran.
+    """
+    n = dist_mx.shape[0]
+    n_children = len(population) - elite_count
+    if n_children <= 0:
+        return population, fitness, generations
+
     for generation in range(generations):
-        # Evaluate fitness
-        population.sort(key=lambda ind: _fitness(ind, dist_mx))
-        elites = population[:elite_count]
-        new_population = elites[:]
-        
+        if budget is not None and (budget.expired() or budget.reached(fitness.min())):
+            return population, fitness, generation
+        elites = np.argpartition(fitness, elite_count - 1)[:elite_count]
+
         # Breed new population
-        while len(new_population) < pop_size:
-            parent1, parent2 = _select_parents(population, dist_mx)
-            child = _crossover(parent1, parent2, start, end, return_to_start)
-            
-            if random.random() < mutation_rate:
-                child = _mutate(child, start, end, return_to_start)
-            
-            new_population.append(child)
-        
-        population = new_population
-    
-    # Return best individual
-    population.sort(key=lambda ind: _fitness(ind, dist_mx))
-    return population[0]
-
-def _initialize_population(n: int, start: Optional[int], end: Optional[int], 
-                         return_to_start: bool, pop_size: int) -> List[List[int]]:
-    """Initialize population based on constraints"""
-    population = []
-    
-    for _ in range(pop_size):
-        if start is not None and end is not None:
-            # Fixed start and end
-            individual = [start]
-            middle = [i for i in range(n) if i != start and i != end]
-            random.shuffle(middle)
-            individual.extend(middle)
-            individual.append(end)
-            
-            if return_to_start and start != end:
-                individual.append(start)
-                
-        elif start is not None:
-            # Fixed start only
-            individual = [start]
-            others = [i for i in range(n) if i != start]
-            random.shuffle(others)
-            individual.extend(others)
-            
-            if return_to_start:
-                individual.append(start)
-                
-        elif end is not None:
-            # Fixed end only
-            others = [i for i in range(n) if i != end]
-            random.shuffle(others)
-            individual = others + [end]
-            
-            if return_to_start:
-                # Find best place to return from end
-                individual.append(individual[0])
-                
-        else:
-            # No fixed points
-            individual = list(range(n))
-            random.shuffle(individual)
-            
-            if return_to_start:
-                individual.append(individual[0])
-        
-        population.append(individual)
-    
-    return population
+        parent1, parent2 = _select_parents(fitness, n_children, rng)
+        children = _crossover(population[parent1], population[parent2], n, rng)
+        children = _mutate(children, mutation_rate, rng)
+
+        population = np.concatenate([population[elites], children])
+        fitness = np.concatenate([fitness[elites], _fitness(children, layout, dist_mx)])
+
+    return population, fitness, generations
+
+def _route_layout(n: int, start: Optional[int], end: Optional[int],
+                  return_to_start: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """
+    Split a route into fixed prefix, freely ordered stops, fixed suffix and
+    whether the route closes back onto its first free stop.
+    """
+    prefix, suffix, close = [], [], False
 
-def _fitness(individual: List[int], dist_mx: np.ndarray) -> float:
-    """Calculate fitness (lower is better)"""
-    return _path_cost(individual, dist_mx)
-
-def _select_parents(population: List[List[int]], dist_mx: np.ndarray) -> tuple:
-    """Tournament selection"""
-    tournament_size = 3
-    tournament = random.sample(population, tournament_size)
-    tournament.sort(key=lambda ind: _fitness(ind, dist_mx))
-    return tournament[0], tournament[1]
-
-def _crossover(parent1: List[int], parent2: List[int], 
-              start: Optional[int], end: Optional[int], 
-              return_to_start: bool) -> List[int]:
-    """Ordered crossover with constraint preservation"""
-    n = len(parent1)
-    child = [None] * n
-    
-    # Preserve fixed positions
-    fixed_positions = {}
-    if start is not None:
-        fixed_positions[0] = start
-    if end is not None and not return_to_start:
-        fixed_positions[n-1] = end
-    elif return_to_start and start is not None:
-        fixed_positions[n-1] = start
-    
-    for pos, value in fixed_positions.items():
-        child[pos] = value
-    
-    # Ordered crossover for non-fixed positions
-    non_fixed_indices = [i for i in range(n) if child[i] is None]
-    
-    if non_fixed_indices:
-        start_idx = min(non_fixed_indices)
-        end_idx = max(non_fixed_indices)
-        
-        # Select random segment from parent1
-        segment_start = random.randint(start_idx, end_idx)
-        segment_end = random.randint(segment_start, end_idx)
-        
-        # Copy segment to child
-        for i in range(segment_start, segment_end + 1):
-            child[i] = parent1[i]
-        
-        # Fill remaining positions from parent2
-        parent2_ptr = 0
-        for i in range(start_idx, end_idx + 1):
-            if child[i] is None:
-                while parent2[parent2_ptr] in child or parent2[parent2_ptr] in fixed_positions.values():
-                    parent2_ptr += 1
-                child[i] = parent2[parent2_ptr]
-                parent2_ptr += 1
-    
+    if start is not None and end is not None:
+        # Fixed start and end
+        prefix = [start]
+        suffix = [end] if end != start else [start]
+        if return_to_start and start != end:
+            suffix.append(start)
+    elif start is not None:
+        # Fixed start only
+        prefix = [start]
+        if return_to_start:
+            suffix = [start]
+    elif end is not None:
+        # Fixed end only; a round trip returns to whichever stop came first
+        suffix = [end]
+        close = return_to_start
+    else:
+        # No fixed points
+        close = return_to_start
+
+    fixed = set(prefix) | set(suffix)
+    free = np.array([i for i in range(n) if i not in fixed], dtype=np.int32)
+    return np.array(prefix, dtype=np.int32), free, np.array(suffix, dtype=np.int32), close
+
+def _assemble(layout: Tuple[np.ndarray, np.ndarray, np.ndarray, bool], population: np.ndarray) -> np.ndarray:
+    """Full routes for each row of ``population`` (one route per row)."""
+    prefix, _, suffix, close = layout
+    rows = population.shape[0]
+    parts = [np.broadcast_to(prefix, (rows, len(prefix))), population,
+             np.broadcast_to(suffix, (rows, len(suffix)))]
+    if close:
+        parts.append(population[:, :1])
+    return np.concatenate(parts, axis=1)
+
+def _initialize_population(free: np.ndarray, pop_size: int, rng: np.random.Generator) -> np.ndarray:
+    """Random permutations of the free stops, one per row"""
+    return rng.permuted(np.tile(free, (pop_size, 1)), axis=1)
+
+def _fitness(population: np.ndarray, layout: Tuple[np.ndarray, np.ndarray, np.ndarray, bool],
+             dist_mx: np.ndarray) -> np.ndarray:
+    """Route cost of every individual (lower is better)"""
+    routes = _assemble(layout, population)
+    return dist_mx[routes[:, :-1], routes[:, 1:]].sum(axis=1)
+
+def _select_parents(fitness: np.ndarray, count: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Tournament selection: best two of three distinct individuals, per child"""
+    tournament_size = min(3, len(fitness))
+    tournaments = np.argpartition(rng.random((count, len(fitness))), tournament_size - 1, axis=1)[:, :tournament_size]
+    ranked = np.take_along_axis(tournaments, np.argsort(fitness[tournaments], axis=1), axis=1)
+    return ranked[:, 0], ranked[:, min(1, tournament_size - 1)]
+
+def _crossover(parent1: np.ndarray, parent2: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Ordered crossover for a batch of parent pairs.
+
+    Each child keeps a random slice of ``parent1`` in place and fills the other
+    positions with the remaining genes in ``parent2`` order, using boolean masks
+    instead of membership scans.
+    """
+    count, m = parent1.shape
+    rows = np.arange(count)[:, None]
+
+    # Select random segment from parent1
+    bounds = np.sort(rng.integers(0, m, (count, 2)), axis=1)
+    cols = np.arange(m)
+    in_segment = (cols >= bounds[:, :1]) & (cols <= bounds[:, 1:])
+
+    # Genes already placed by the segment, looked up by gene value
+    taken = np.zeros((count, n), dtype=bool)
+    taken[rows, parent1] = in_segment
+
+    child = np.where(in_segment, parent1, 0).astype(parent1.dtype)
+    child[~in_segment] = parent2[~taken[rows, parent2]]
     return child
 
-def _mutate(individual: List[int], start: Optional[int], 
-           end: Optional[int], return_to_start: bool) -> List[int]:
-    """Swap mutation that preserves constraints"""
-    n = len(individual)
-    mutated = individual[:]
-    
-    # Identify mutable positions (not fixed)
-    fixed_positions = set()
-    if start is not None:
-        fixed_positions.add(0)
-    if end is not None and not return_to_start:
-        fixed_positions.add(n-1)
-    elif return_to_start and start is not None:
-        fixed_positions.add(n-1)
-    
-    mutable_indices = [i for i in range(n) if i not in fixed_positions]
-    
-    if len(mutable_indices) >= 2:
-        i, j = random.sample(mutable_indices, 2)
-        mutated[i], mutated[j] = mutated[j], mutated[i]
-    
-    return mutated
\ No newline at end of file
+def _mutate(population: np.ndarray, mutation_rate: float, rng: np.random.Generator) -> np.ndarray:
+    """Swap mutation on a random subset of rows"""
+    count, m = population.shape
+    mutants = np.flatnonzero(rng.random(count) < mutation_rate)
+    if len(mutants) == 0 or m < 2:
+        return population
+
+    i = rng.integers(0, m, len(mutants))
+    j = (i + rng.integers(1, m, len(mutants))) % m
+    population[mutants, i], population[mutants, j] = population[mutants, j], population[mutants, i]
+    return population
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from .budget import SolveBudget
+from .nn import nearest_neighbor
+
+# 2^20 x 20 DP table is ~170 MB; beyond that use a heuristic
+MAX_FREE_STOPS = 20
+
+def held_karp(
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Exact bitmask dynamic program (Held-Karp) with fixed start/end support.
+
+    The stops between the fixed ends are ordered optimally by a DP over subsets
+    that is vectorized per subset size: for every subset of ``k`` stops and every
+    last stop ``j`` it takes the best predecessor in one row-wise argmin.
+    O(2^m * m^2) time for ``m`` free stops, so only meant for small routes.
+    There is no partial answer, so if ``budget`` expires mid-way the nearest
+    neighbor route is returned instead.
+    """
+    budget = budget or SolveBudget()
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    n = dist_mx.shape[0]
+    if n <= 1:
+        budget.converged = True
+        return list(range(n))
+
+    source, sink = _ends(start, end, return_to_start)
+    fixed = {source, sink} - {None}
+    free = np.array([i for i in range(n) if i not in fixed], dtype=np.intp)
+    middle = _best_order(dist_mx, free, source, sink, budget)
+    if middle is None:
+        route = nearest_neighbor(dist_mx, start, end, return_to_start, budget)
+        budget.converged = False
+        return route
+    budget.converged = True
+
+    if start is not None:
+        route = [start] + middle + ([sink] if sink is not None else [])
+        if return_to_start and end is not None and end != start:
+            route.append(start)
+        return route
+    if end is not None and return_to_start:
+        return middle + [end] + middle[:1] if middle else [end]
+    if return_to_start:
+        return [0] + middle + [0]
+    return middle + ([end] if end is not None else [])
+
+def free_stop_count(n: int, start: Optional[int] = None, end: Optional[int] = None,
+                    return_to_start: bool = False) -> int:
+    """Stops ``held_karp`` has to order for a route over ``n`` places"""
+    return n - len(set(_ends(start, end, return_to_start)) - {None})
+
+def _ends(start: Optional[int], end: Optional[int], return_to_start: bool) -> Tuple[Optional[int], Optional[int]]:
+    """Fixed node before the free stops (source) and after them (sink), ``None`` for an open end"""
+    if start is not None:
+        return start, end if end is not None else (start if return_to_start else None)
+    if end is not None:
+        # A round trip that ends at `end` is a cycle through it
+        return (end, end) if return_to_start else (None, end)
+    return (0, 0) if return_to_start else (None, None)
+
+def _best_order(dist_mx: np.ndarray, free: np.ndarray, source: Optional[int], sink: Optional[int],
+                budget: SolveBudget) -> Optional[List[int]]:
+    """
+    Cheapest ordering of ``free`` between ``source`` and ``sink`` (``None`` = open end),
+    or ``None`` if ``budget`` expired first.
+    """
+    m = len(free)
+    if m == 0:
+        return []
+    if m > MAX_FREE_STOPS:
+        raise ValueError(f"Held-Karp supports at most {MAX_FREE_STOPS} free stops, got {m}")
+
+    sub = dist_mx[np.ix_(free, free)]
+    first = dist_mx[source, free] if source is not None else np.zeros(m)
+    last = dist_mx[free, sink] if sink is not None else np.zeros(m)
+
+    full = 1 << m
+    subsets = np.arange(full)
+    size = np.zeros(full, dtype=np.intp)
+    for j in range(m):
+        size += (subsets >> j) & 1
+
+    # cost[S, j]: cheapest path from source through subset S ending at stop j
+    cost = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int8)
+    cost[1 << np.arange(m), np.arange(m)] = first
+
+    for k in range(2, m + 1):
+        if budget.expired():
+            return None
+        budget.iterations += 1
+        layer = subsets[size == k]
+        for j in range(m):
+            with_j = layer[(layer >> j) & 1 == 1]
+            candidates = cost[with_j ^ (1 << j)] + sub[:, j]
+            best = candidates.argmin(axis=1)
+            cost[with_j, j] = candidates[np.arange(len(with_j)), best]
+            parent[with_j, j] = best
+
+    # Walk the parents back from the best final stop
+    j = int(np.argmin(cost[full - 1] + last))
+    subset, order = full - 1, []
+    while j >= 0:
+        order.append(int(free[j]))
+        subset, j = subset ^ (1 << j), int(parent[subset, j])
+    return order[::-1]
@@ -0,0 +1,92 @@
+import numpy as np
+from typing import List, Optional, Sequence
+from .budget import SolveBudget
+from .local_search import _local_search_descent
+from .two_opt import _is_symmetric, _movable_range, _neighbor_lists
+
+def reoptimize(
+    previous: Sequence[Optional[int]],
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    neighbor_k: int = 10,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Repair a previously optimized route after stops were added or removed.
+
+    ``previous`` is the old visiting order mapped to current indices, with
+    ``None`` for stops that no longer exist. Those are spliced out, fixed
+    start/end stops are put back in place, every stop missing from the old order
+    is added by cheapest insertion, and a local search seeded only with the
+    stops around the edits repairs the result.
+    """
+    budget = budget or SolveBudget()
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    n = dist_mx.shape[0]
+
+    # Open sequence of known stops, closing copy and fixed ends removed
+    fixed_end = end if end is not None and end != start else None
+    seq, seen, touched = [], set(), set()
+    for i, node in enumerate(previous):
+        if node is None or not 0 <= node < n:
+            # Spliced out: its old neighbors get re-examined
+            touched.update(x for x in (previous[i - 1] if i else None,
+                                       previous[i + 1] if i + 1 < len(previous) else None)
+                           if x is not None and 0 <= x < n)
+            continue
+        if node not in seen and node != start and node != fixed_end:
+            seen.add(node)
+            seq.append(node)
+
+    missing = [x for x in range(n) if x not in seen and x != start and x != fixed_end]
+    touched.update(missing)
+    touched.update(x for x in (start, fixed_end) if x is not None)
+    if not seq and missing:
+        # Round trips close on their first free stop, so there must be one
+        seq.append(missing.pop(0))
+
+    tour = ([start] if start is not None else []) + seq + ([fixed_end] if fixed_end is not None else [])
+    if return_to_start and tour:
+        tour.append(tour[0])
+    for node in missing:
+        _cheapest_insert(tour, dist_mx, node, start, end, return_to_start)
+
+    lo, hi = _movable_range(tour, start, end, return_to_start)
+    if len(tour) > 3 and hi - lo >= 1:
+        _local_search_descent(
+            tour,
+            dist_mx.tolist(),
+            _neighbor_lists(dist_mx, neighbor_k),
+            lo,
+            hi,
+            symmetric=_is_symmetric(dist_mx),
+            queue=[x for x in tour if x in touched],
+            max_evals=50 * len(tour),
+            budget=budget
+        )
+    else:
+        budget.converged = True
+    return tour
+
+def _cheapest_insert(tour: List[int], dist_mx: np.ndarray, node: int, start: Optional[int],
+                     end: Optional[int], return_to_start: bool) -> None:
+    """Insert ``node`` in place at the cheapest position the start/end constraints allow."""
+    L = len(tour)
+    lo, hi = _movable_range(tour, start, end, return_to_start)
+
+    # Candidate legs (tour[p], tour[p + 1]) for p in lo - 1 .. hi, open ends included
+    p = np.arange(lo - 1, hi + 1)
+    idx = np.asarray(tour)
+    inner = (p >= 0) & (p < L - 1)
+    added = np.zeros(len(p))
+    removed = np.zeros(len(p))
+    head = p >= 0
+    tail = p < L - 1
+    added[head] += dist_mx[idx[p[head]], node]
+    added[tail] += dist_mx[node, idx[p[tail] + 1]]
+    removed[inner] = dist_mx[idx[p[inner]], idx[p[inner] + 1]]
+
+    best = int(p[np.argmin(added - removed)])
+    tour.insert(best + 1, node)
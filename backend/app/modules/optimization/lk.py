@@ -0,0 +1,235 @@
+import random
+import numpy as np
+from collections import deque
+from typing import Iterable, List, Optional, Set
+from .nn import nearest_neighbor
+from .budget import SolveBudget
+from .two_opt import (
+    _EPS,
+    _best_two_opt_move,
+    _is_symmetric,
+    _movable_range,
+    _neighbor_lists,
+    _positions,
+    _prefix_costs,
+    _reversal_gain,
+    _reverse,
+)
+from .local_search import _around, _best_or_opt_move, _move_segment, _pos_in
+
+def lin_kernighan(
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    max_depth: int = 6,
+    kicks: Optional[int] = None,
+    neighbor_k: int = 8,
+    seed: Optional[int] = None,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Iterated Lin-Kernighan style solver with fixed start/end support.
+
+    A nearest neighbor tour is improved with variable-depth LK moves (chains of
+    up to ``max_depth`` reversals anchored at one node, restricted to candidate
+    neighbor lists) plus Or-opt. The local optimum is then repeatedly perturbed
+    with a random Or-opt kick and re-optimized around the kick; a kicked tour
+    replaces the best one only if it is cheaper. ``kicks`` defaults to ``10 * n``
+    capped at 1000; ``budget`` ends the kick loop (or the first descent) early,
+    on its deadline or once its target cost is reached.
+    """
+    budget = budget or SolveBudget()
+    initial = nearest_neighbor(dist_mx, start, end, return_to_start, budget)
+    if len(initial) <= 3:
+        return initial
+
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    lo, hi = _movable_range(initial, start, end, return_to_start)
+    if hi - lo < 1:
+        return initial
+
+    D = dist_mx.tolist()
+    neighbors = _neighbor_lists(dist_mx, neighbor_k)
+    symmetric = _is_symmetric(dist_mx)
+    rng = random.Random(seed)
+    if kicks is None:
+        kicks = min(1000, 10 * dist_mx.shape[0])
+
+    best = list(initial)
+    _lk_descent(best, D, neighbors, lo, hi, symmetric, max_depth=max_depth, budget=budget)
+    best_cost = _tour_cost(best, D)
+    done = 0
+
+    while done < kicks and not budget.expired() and not budget.reached(best_cost):
+        tour = best[:]
+        touched = _or_opt_kick(tour, rng, lo, hi)
+        if not touched:
+            break
+        done += 1
+        _lk_descent(tour, D, neighbors, lo, hi, symmetric, queue=touched, max_depth=max_depth, budget=budget)
+        cost = _tour_cost(tour, D)
+        if cost < best_cost - _EPS:
+            best, best_cost = tour, cost
+
+    budget.iterations += done
+    budget.converged = done == kicks or not budget.expired()
+    return best
+
+def _lk_descent(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    lo: int,
+    hi: int,
+    symmetric: bool = False,
+    queue: Optional[Iterable[int]] = None,
+    max_depth: int = 6,
+    budget: Optional[SolveBudget] = None
+) -> int:
+    """
+    Apply improving LK chains, 2-opt and Or-opt moves to ``tour`` in place.
+
+    ``queue`` seeds the don't-look bits (defaults to every node) and ``budget``
+    interrupts the descent. Returns the number of improving moves applied.
+    """
+    L = len(tour)
+    closed = L > 1 and tour[0] == tour[-1]
+    pos = _positions(tour, len(D))
+    F, B = _prefix_costs(tour, D, symmetric)
+
+    queue = deque(tour if queue is None else queue)
+    active = set(queue)
+    moves = 0
+
+    while queue:
+        if budget is not None and budget.expired():
+            break
+        a = queue.popleft()
+        active.discard(a)
+
+        touched = _lk_chain(tour, D, neighbors, pos, F, B, a, lo, hi, closed, symmetric, max_depth)
+        if touched is None:
+            move = _best_two_opt_move(tour, D, neighbors, pos, F, B, a, lo, hi, closed)
+            if move is not None:
+                touched = _around(tour, *move)
+                _reverse(tour, pos, *move)
+        if touched is None:
+            move = _best_or_opt_move(tour, D, neighbors, pos, a, lo, hi, closed)
+            if move is None:
+                continue
+            i, j, p, reverse = move
+            touched = _around(tour, i, j) | _around(tour, p, p)
+            _move_segment(tour, pos, i, j, p, reverse)
+
+        if not symmetric:
+            F, B = _prefix_costs(tour, D, symmetric)
+        moves += 1
+
+        for node in touched:
+            if node not in active:
+                active.add(node)
+                queue.append(node)
+
+    if budget is not None:
+        budget.iterations += moves
+    return moves
+
+def _lk_chain(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    pos: List[int],
+    F: List[float],
+    B: List[float],
+    a: int,
+    lo: int,
+    hi: int,
+    closed: bool,
+    symmetric: bool,
+    max_depth: int
+) -> Optional[Set[int]]:
+    """
+    Variable-depth move anchored at ``a``: a chain of reversals of ``tour[i..k]``
+    with ``i`` right after ``a``.
+
+    Each step breaks the edge leaving ``a`` and reconnects its head to a candidate
+    neighbor, picking the step with the best exact gain while the partial (open)
+    gain stays positive; edges added earlier in the chain are never broken again.
+    The chain is rolled back to its most profitable prefix. Returns the touched
+    nodes if the tour improved, otherwise ``None`` with the tour unchanged.
+    """
+    L = len(tour)
+    i = pos[a] + 1
+    if not (lo <= i < hi):
+        return None
+
+    applied: List[int] = []
+    added: Set[tuple] = set()
+    touched = {a}
+    gain, best_gain, best_depth = 0.0, _EPS, 0
+
+    for _ in range(max_depth):
+        t2 = tour[i]
+        open_base = gain + D[a][t2]
+        step_k, step_gain = None, float("-inf")
+
+        for t3 in neighbors[t2]:
+            if open_base - D[t2][t3] <= 0:
+                break
+            k = _pos_in(tour, pos, t3, closed) - 1
+            if not (i < k <= hi) or (tour[k], t3) in added:
+                continue
+            g = _reversal_gain(tour, D, F, B, i, k)
+            if g > step_gain:
+                step_k, step_gain = k, g
+
+        # Free path end: t2 may simply become the last stop (only if that pays off
+        # by itself, since no new edge bounds the open gain)
+        if hi == L - 1 and i < L - 1:
+            g = _reversal_gain(tour, D, F, B, i, L - 1)
+            if g > max(step_gain, 0.0):
+                step_k, step_gain = L - 1, g
+
+        if step_k is None:
+            break
+
+        k = step_k
+        if k < L - 1:
+            added.update({(t2, tour[k + 1]), (tour[k + 1], t2)})
+        touched.update(_around(tour, i, k))
+        _reverse(tour, pos, i, k)
+        applied.append(k)
+        if not symmetric:
+            F, B = _prefix_costs(tour, D, symmetric)
+
+        gain += step_gain
+        if gain > best_gain:
+            best_gain, best_depth = gain, len(applied)
+
+    for k in reversed(applied[best_depth:]):
+        _reverse(tour, pos, i, k)
+
+    return touched if best_depth else None
+
+def _or_opt_kick(tour: List[int], rng: random.Random, lo: int, hi: int, reach: int = 10) -> Set[int]:
+    """Move a random 1-3 node segment to a nearby position; returns the touched nodes."""
+    span = hi - lo + 1
+    if span < 4:
+        return set()
+
+    length = rng.randint(1, min(3, span - 2))
+    i = rng.randint(lo, hi - length + 1)
+    j = i + length - 1
+    spots = [p for p in range(max(lo - 1, i - reach), i - 1)]
+    spots += [p for p in range(j + 1, min(hi, j + reach) + 1)]
+    if not spots:
+        return set()
+
+    p = rng.choice(spots)
+    touched = _around(tour, i, j) | _around(tour, p, p)
+    _move_segment(tour, _positions(tour, max(tour) + 1), i, j, p, rng.random() < 0.5)
+    return touched
+
+def _tour_cost(tour: List[int], D: List[List[float]]) -> float:
+    return sum(D[tour[j]][tour[j + 1]] for j in range(len(tour) - 1))
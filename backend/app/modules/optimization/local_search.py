@@ -0,0 +1,273 @@
+import numpy as np
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+from .nn import nearest_neighbor
+from .budget import SolveBudget
+from .two_opt import (
+    _EPS,
+    _best_two_opt_move,
+    _is_symmetric,
+    _movable_range,
+    _neighbor_lists,
+    _positions,
+    _prefix_costs,
+    _reverse,
+)
+
+# A move is (i, j, p, reverse) for segment moves or (i, k) for 2-opt reversals
+Move = Tuple[int, ...]
+
+def local_search(
+    path: List[int],
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    max_passes: int = 50,
+    neighbor_k: int = 10,
+    max_segment: int = 3,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Improve a route with 2-opt, Or-opt and segment-insertion 3-opt moves.
+
+    Every node taken from the don't-look queue tries a 2-opt reversal first, then
+    moving a segment of 1..``max_segment`` nodes (either orientation) next to one
+    of its neighbors, then an orientation-preserving 3-opt segment exchange. All
+    gains are evaluated incrementally from the edges a move touches, and only
+    positions allowed by the start/end constraints are moved. ``budget`` stops
+    the search early with the best route so far.
+    """
+    budget = budget or SolveBudget()
+    if len(path) <= 3:
+        budget.converged = True
+        return path
+
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    tour = list(path)
+    lo, hi = _movable_range(tour, start, end, return_to_start)
+    if hi - lo < 1:
+        budget.converged = True
+        return tour
+
+    _local_search_descent(
+        tour,
+        dist_mx.tolist(),
+        _neighbor_lists(dist_mx, neighbor_k),
+        lo,
+        hi,
+        symmetric=_is_symmetric(dist_mx),
+        max_evals=max_passes * len(tour),
+        max_segment=max_segment,
+        budget=budget
+    )
+    return tour
+
+def _local_search_descent(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    lo: int,
+    hi: int,
+    symmetric: bool = False,
+    queue: Optional[Iterable[int]] = None,
+    max_evals: Optional[int] = None,
+    max_segment: int = 3,
+    budget: Optional[SolveBudget] = None
+) -> int:
+    """
+    Apply improving 2-opt / Or-opt / 3-opt moves to ``tour`` in place.
+
+    Works like ``_two_opt_descent``: ``queue`` seeds the don't-look bits, the
+    nodes around every applied move are re-queued and ``budget`` is updated the
+    same way. Returns the number of moves.
+    """
+    L = len(tour)
+    closed = L > 1 and tour[0] == tour[-1]
+    pos = _positions(tour, len(D))
+    F, B = _prefix_costs(tour, D, symmetric)
+
+    queue = deque(tour if queue is None else queue)
+    active = set(queue)
+    evals = moves = 0
+
+    while queue:
+        if max_evals is not None and evals >= max_evals:
+            break
+        if budget is not None and budget.expired():
+            break
+        evals += 1
+        a = queue.popleft()
+        active.discard(a)
+
+        move = _best_two_opt_move(tour, D, neighbors, pos, F, B, a, lo, hi, closed)
+        if move is not None:
+            i, k = move
+            touched = _around(tour, i, k)
+            _reverse(tour, pos, i, k)
+        else:
+            move = (_best_or_opt_move(tour, D, neighbors, pos, a, lo, hi, closed, max_segment)
+                    or _best_or3_move(tour, D, neighbors, pos, a, lo, hi, closed))
+            if move is None:
+                continue
+            i, j, p, reverse = move
+            touched = _around(tour, i, j) | _around(tour, p, p)
+            _move_segment(tour, pos, i, j, p, reverse)
+
+        F, B = _prefix_costs(tour, D, symmetric)
+        moves += 1
+
+        for node in touched:
+            if node not in active:
+                active.add(node)
+                queue.append(node)
+
+    if budget is not None:
+        budget.iterations += moves
+        budget.converged = not queue
+    return moves
+
+def _best_or_opt_move(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    pos: List[int],
+    a: int,
+    lo: int,
+    hi: int,
+    closed: bool,
+    max_segment: int = 3
+) -> Optional[Move]:
+    """Best improving relocation of the 1..``max_segment`` node segment starting at ``a``."""
+    L = len(tour)
+    i = pos[a]
+    if i < lo:
+        return None
+
+    prev = tour[i - 1] if i > 0 else None
+    best_gain, best_move = _EPS, None
+
+    for j in range(i, min(i + max_segment, hi + 1)):
+        s1, s2 = a, tour[j]
+        nxt = tour[j + 1] if j < L - 1 else None
+        removal = _d(D, prev, s1) + _d(D, s2, nxt) - _d(D, prev, nxt)
+        if removal <= _EPS:
+            continue
+
+        fwd = sum(D[tour[m]][tour[m + 1]] for m in range(i, j))
+        rev = sum(D[tour[m + 1]][tour[m]] for m in range(i, j))
+
+        # Insertion edges (tour[p], tour[p + 1]) next to neighbors of either end
+        candidates = set()
+        for x in neighbors[s1]:
+            candidates.add((pos[x], False))                   # x -> s1 .. s2
+            candidates.add((_pos_in(tour, pos, x, closed) - 1, True))   # s2 .. s1 -> x
+        for x in neighbors[s2]:
+            candidates.add((_pos_in(tour, pos, x, closed) - 1, False))  # s1 .. s2 -> x
+            candidates.add((pos[x], True))                    # x -> s2 .. s1
+        if lo == 0:
+            candidates.update({(-1, False), (-1, True)})
+        if hi == L - 1:
+            candidates.update({(L - 1, False), (L - 1, True)})
+
+        for p, reverse in candidates:
+            if not (lo - 1 <= p <= hi) or i - 2 < p < j + 1:
+                continue
+            c = tour[p] if p >= 0 else None
+            e = tour[p + 1] if p < L - 1 else None
+            first, last = (s2, s1) if reverse else (s1, s2)
+            added = _d(D, c, first) + _d(D, last, e) - _d(D, c, e) + (rev - fwd if reverse else 0.0)
+            gain = removal - added
+            if gain > best_gain:
+                best_gain, best_move = gain, (i, j, p, reverse)
+
+    return best_move
+
+def _best_or3_move(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    pos: List[int],
+    a: int,
+    lo: int,
+    hi: int,
+    closed: bool
+) -> Optional[Move]:
+    """
+    Best improving segment exchange ``A B C D -> A C B D`` with ``a`` ending A.
+
+    Orientation is preserved, so the gain only depends on the three removed and
+    three added edges even on asymmetric matrices.
+    """
+    L = len(tour)
+    i = pos[a] + 1
+    if i < lo or i >= hi:
+        return None
+
+    b1 = tour[i]
+    best_gain, best_move = _EPS, None
+
+    for c in neighbors[a]:
+        g1 = D[a][b1] - D[a][c]
+        if g1 <= 0:
+            break
+        j1 = pos[c]                      # C starts at j1, so B is tour[i .. j1 - 1]
+        if not (i < j1 <= hi):
+            continue
+        b2 = tour[j1 - 1]
+        g2 = g1 + D[b2][c]
+
+        ends = [(_pos_in(tour, pos, e, closed) - 1, e) for e in neighbors[b2]]
+        if hi == L - 1:
+            ends.append((L - 1, None))
+        for k, e in ends:
+            if not (j1 <= k <= hi):
+                continue
+            c2 = tour[k]
+            gain = g2 + _d(D, c2, e) - D[c2][b1] - _d(D, b2, e)
+            if gain > best_gain:
+                best_gain, best_move = gain, (i, j1 - 1, k, False)
+
+    return best_move
+
+def _move_segment(tour: List[int], pos: List[int], i: int, j: int, p: int, reverse: bool) -> None:
+    """Move ``tour[i..j]`` between positions ``p`` and ``p + 1`` in place."""
+    segment = tour[i:j + 1]
+    if reverse:
+        segment.reverse()
+    if p < i:
+        tour[p + 1:j + 1] = segment + tour[p + 1:i]
+        lo, hi = p + 1, j
+    else:
+        tour[i:p + 1] = tour[j + 1:p + 1] + segment
+        lo, hi = i, p
+    for m in range(lo, hi + 1):
+        pos[tour[m]] = m
+
+def _around(tour: List[int], i: int, k: int) -> set:
+    """Nodes at positions ``i - 1 .. k + 1`` edges of a move touch."""
+    return {tour[m] for m in (i - 1, i, k, k + 1) if 0 <= m < len(tour)}
+
+def _pos_in(tour: List[int], pos: List[int], x: int, closed: bool) -> int:
+    """Position of ``x`` as the head of an incoming edge (the closing copy on round trips)."""
+    return len(tour) - 1 if closed and x == tour[0] else pos[x]
+
+def _d(D: List[List[float]], a: Optional[int], b: Optional[int]) -> float:
+    """Edge cost, with ``None`` standing for the open end of a path."""
+    if a is None or b is None:
+        return 0.0
+    return D[a][b]
+
+def local_search_optimize(
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    max_passes: int = 50,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Nearest neighbor construction followed by 2-opt / Or-opt / 3-opt local search
+    """
+    initial = nearest_neighbor(dist_mx, start, end, return_to_start, budget)
+    return local_search(initial, dist_mx, start, end, return_to_start, max_passes, budget=budget)
@@ -0,0 +1,79 @@
+import numpy as np
+from typing import Any, Optional, Tuple
+
+class CostMatrix:
+    """
+    Square cost matrix stored compactly: float32 values, and only the upper
+    triangle (row by row, diagonal included) when the matrix is symmetric.
+
+    Solvers accept it wherever they accept an array: ``np.asarray(m, dtype=float)``
+    expands it through ``__array__``. Single legs or arrays of legs are read
+    with ``m[i, j]`` without expanding anything.
+    """
+
+    def __init__(self, values: np.ndarray, n: int, symmetric: bool):
+        self.values = values
+        self.n = n
+        self.symmetric = symmetric
+
+    @classmethod
+    def from_rows(cls, rows: Any, pack: bool = True) -> "CostMatrix":
+        """
+        Build from rows of costs (nested lists or an array); ``None`` cells
+        (unreachable in OSRM tables) become NaN. Symmetric matrices are packed
+        unless ``pack`` is false.
+        """
+        dense = np.asarray(rows, dtype=np.float32)
+        if dense.ndim != 2 or dense.shape[0] != dense.shape[1]:
+            raise ValueError(f"Cost matrix must be square, got shape {dense.shape}")
+        n = dense.shape[0]
+        if not pack or not np.array_equal(dense, dense.T):
+            return cls(np.ascontiguousarray(dense), n, False)
+
+        values = np.empty(n * (n + 1) // 2, dtype=np.float32)
+        offset = 0
+        for i in range(n):
+            values[offset:offset + n - i] = dense[i, i:]
+            offset += n - i
+        return cls(values, n, True)
+
+    @classmethod
+    def of(cls, matrix: Any) -> "CostMatrix":
+        """``matrix`` itself if it already is a CostMatrix, else a compact copy of it"""
+        return matrix if isinstance(matrix, cls) else cls.from_rows(matrix)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n, self.n
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __array__(self, dtype: Optional[np.dtype] = None, copy: Optional[bool] = None) -> np.ndarray:
+        if not self.symmetric:
+            return self.values.astype(dtype or self.values.dtype, copy=copy is not False)
+
+        dense = np.empty((self.n, self.n), dtype=dtype or self.values.dtype)
+        offset = 0
+        for i in range(self.n):
+            row = self.values[offset:offset + self.n - i]
+            dense[i, i:] = row
+            dense[i:, i] = row
+            offset += self.n - i
+        return dense
+
+    def __getitem__(self, key: Tuple[Any, Any]) -> Any:
+        i, j = key
+        if not self.symmetric:
+            return self.values[i, j]
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        # Row i starts after the i previous rows of n, n-1, ... cells
+        return self.values[i * self.n - i * (i - 1) // 2 + (j - i)]
+
+    def tobytes(self) -> bytes:
+        """Stored values with the layout, for fingerprinting"""
+        return f"{self.n}|{int(self.symmetric)}|".encode() + self.values.tobytes()
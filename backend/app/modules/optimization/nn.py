@@ -1,14 +1,24 @@
 import numpy as np
-from typing import List, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
+from .budget import SolveBudget
+
+# Upper bound on (starts x nodes) cells materialised per batched NN step
+_BATCH_CELLS = 1 << 22
 
 def nearest_neighbor(
     dist_mx: np.ndarray,
     start: Optional[int] = None,
     end: Optional[int] = None,
-    return_to_start: bool = False
+    return_to_start: bool = False,
+    budget: Optional[SolveBudget] = None
 ) -> List[int]:
-    n = dist_mx.shape[0]
-    
+    dist_mx = np.asarray(dist_mx, dtype=float)
+
+    # A single greedy construction; too fast to be worth interrupting
+    if budget is not None:
+        budget.iterations += 1
+        budget.converged = True
+
     # Handle different optimization scenarios
     if start is not None and end is not None:
         # Fixed start and end points
@@ -27,40 +37,26 @@ def _nn_fixed_start_end(dist_mx: np.ndarray, start: int, end: int) -> List[int]:
     """Fixed start and end points"""
     n = dist_mx.shape[0]
     if n <= 2:
-        return [start, end] if start != end else [start]
-    
-    unvisited = set(range(n)) - {start, end}
-    path = [start]
-    current = start
-    
-    while unvisited:
-        next_node = min(unvisited, key=lambda j: dist_mx[current][j])
-        path.append(next_node)
-        unvisited.remove(next_node)
-        current = next_node
-    
-    path.append(end)
-    return path
+        if start != end:
+            return [start, end]
+        # Round trip: through the other stop if there is one
+        return [start] + [i for i in range(n) if i != start] + [start] if n == 2 else [start]
+
+    paths, _ = _nn_batch(dist_mx, [start], exclude=(end,))
+    return paths[0].tolist() + [end]
 
 def _nn_fixed_start(dist_mx: np.ndarray, start: int, return_to_start: bool) -> List[int]:
     """Fixed start point only"""
     n = dist_mx.shape[0]
     if n == 1:
         return [start]
-    
-    unvisited = set(range(n)) - {start}
-    path = [start]
-    current = start
-    
-    while unvisited:
-        next_node = min(unvisited, key=lambda j: dist_mx[current][j])
-        path.append(next_node)
-        unvisited.remove(next_node)
-        current = next_node
-    
+
+    paths, _ = _nn_batch(dist_mx, [start])
+    path = paths[0].tolist()
+
     if return_to_start:
         path.append(start)
-    
+
     return path
 
 def _nn_fixed_end(dist_mx: np.ndarray, end: int, return_to_start: bool) -> List[int]:
@@ -68,40 +64,22 @@ def _nn_fixed_end(dist_mx: np.ndarray, end: int, return_to_start: bool) -> List[
     n = dist_mx.shape[0]
     if n == 1:
         return [end]
-    
-    # Try all possible starting points and choose the best
-    best_path = None
-    best_cost = float('inf')
-    
-    for start in range(n):
-        if start == end:
-            continue
-            
-        path = [start]
-        current = start
-        unvisited = set(range(n)) - {start, end}
-        
-        while unvisited:
-            next_node = min(unvisited, key=lambda j: dist_mx[current][j])
-            path.append(next_node)
-            unvisited.remove(next_node)
-            current = next_node
-        
-        path.append(end)
-        
-        if return_to_start:
-            # Find the best place to return to start from end
-            cost = _path_cost(path, dist_mx) + dist_mx[end][start]
-            if cost < best_cost:
-                best_cost = cost
-                best_path = path + [start]
-        else:
-            cost = _path_cost(path, dist_mx)
-            if cost < best_cost:
-                best_cost = cost
-                best_path = path
-    
-    return best_path or [end]
+
+    # Grow a path from every possible start at once and keep the cheapest
+    starts = np.array([i for i in range(n) if i != end], dtype=np.intp)
+    paths, costs = _nn_batch(dist_mx, starts, exclude=(end,))
+    costs += dist_mx[paths[:, -1], end]
+
+    if return_to_start:
+        # Account for the leg from the end back to each start
+        costs += dist_mx[end, starts]
+
+    best = int(np.argmin(costs))
+    best_path = paths[best].tolist() + [end]
+    if return_to_start:
+        best_path.append(best_path[0])
+
+    return best_path
 
 def _nn_free_start_end(dist_mx: np.ndarray, return_to_start: bool) -> List[int]:
     """No fixed points - find optimal start/end"""
@@ -110,7 +88,7 @@ def _nn_free_start_end(dist_mx: np.ndarray, return_to_start: bool) -> List[int]:
         return []
     if n == 1:
         return [0]
-    
+
     if return_to_start:
         # Traditional TSP - return to start
         return _nn_tsp(dist_mx)
@@ -121,54 +99,65 @@ def _nn_free_start_end(dist_mx: np.ndarray, return_to_start: bool) -> List[int]:
 def _nn_tsp(dist_mx: np.ndarray) -> List[int]:
     """Traditional TSP with return to start"""
     n = dist_mx.shape[0]
-    best_path = None
-    best_cost = float('inf')
-    
-    for start in range(n):
-        path = [start]
-        current = start
-        unvisited = set(range(n)) - {start}
-        
-        while unvisited:
-            next_node = min(unvisited, key=lambda j: dist_mx[current][j])
-            path.append(next_node)
-            unvisited.remove(next_node)
-            current = next_node
-        
-        path.append(start)  # Return to start
-        cost = _path_cost(path, dist_mx)
-        
-        if cost < best_cost:
-            best_cost = cost
-            best_path = path
-    
-    return best_path or list(range(n))
+    starts = np.arange(n)
+    paths, costs = _nn_batch(dist_mx, starts)
+    costs += dist_mx[paths[:, -1], starts]  # Return to start
+
+    best = int(np.argmin(costs))
+    return paths[best].tolist() + [best]
 
 def _nn_open_tsp(dist_mx: np.ndarray) -> List[int]:
     """Open TSP without return to start"""
     n = dist_mx.shape[0]
-    best_path = None
-    best_cost = float('inf')
-    
-    for start in range(n):
-        path = [start]
-        current = start
-        unvisited = set(range(n)) - {start}
-        
-        while unvisited:
-            next_node = min(unvisited, key=lambda j: dist_mx[current][j])
-            path.append(next_node)
-            unvisited.remove(next_node)
-            current = next_node
-        
-        cost = _path_cost(path, dist_mx)
-        
-        if cost < best_cost:
-            best_cost = cost
-            best_path = path
-    
-    return best_path or list(range(n))
+    paths, costs = _nn_batch(dist_mx, np.arange(n))
+
+    return paths[int(np.argmin(costs))].tolist()
+
+def _nn_batch(
+    dist_mx: np.ndarray,
+    starts: Sequence[int],
+    exclude: Iterable[int] = ()
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grow one nearest-neighbor path per start node as a single batched computation.
+
+    Every step gathers the rows of the current nodes, adds a +inf penalty on
+    visited (and excluded) columns and takes the row-wise argmin. Ties resolve to the lowest
+    index, matching ``min`` over the unvisited set. Returns the ``(len(starts), m)``
+    paths and their accumulated costs, summed leg by leg in visiting order.
+    """
+    n = dist_mx.shape[0]
+    starts = np.asarray(starts, dtype=np.intp)
+    excluded = np.zeros(n, dtype=bool)
+    excluded[list(exclude)] = True
+    excluded[starts] = False
+    length = n - int(excluded.sum())
+
+    paths = np.empty((len(starts), length), dtype=np.intp)
+    costs = np.zeros(len(starts))
+    block = max(1, _BATCH_CELLS // max(n, 1))
+
+    for lo in range(0, len(starts), block):
+        current = starts[lo:lo + block]
+        rows = np.arange(len(current))
+        penalty = np.where(excluded, np.inf, 0.0)
+        penalty = np.tile(penalty, (len(current), 1))
+        penalty[rows, current] = np.inf
+        paths[lo:lo + block, 0] = current
+        block_costs = costs[lo:lo + block]
+
+        for step in range(1, length):
+            nxt = (dist_mx[current] + penalty).argmin(axis=1)
+            block_costs += dist_mx[current, nxt]
+            penalty[rows, nxt] = np.inf
+            paths[lo:lo + block, step] = nxt
+            current = nxt
+
+    return paths, costs
 
 def _path_cost(path: List[int], dist_mx: np.ndarray) -> float:
     """Calculate total cost of a path"""
-    return sum(dist_mx[path[i]][path[i+1]] for i in range(len(path)-1))
\ No newline at end of file
+    path = np.asarray(path, dtype=np.intp)
+    if path.size < 2:
+        return 0.0
+    return float(np.asarray(dist_mx)[path[:-1], path[1:]].sum())
@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# (shared memory name, shape, dtype) - all a worker needs to map a matrix
+MatrixRef = Tuple[str, Tuple[int, ...], str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_max_workers = os.cpu_count() or 1
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+# Segments a worker keeps mapped; a task may attach more than one (matrix + flags)
+_MAX_ATTACHED = 4
+
+def configure_pool(max_workers: int) -> None:
+    """Size of the shared pool (one worker per core by default); takes effect when it is next created."""
+    global _max_workers
+    _max_workers = max(1, max_workers)
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by the parallel solvers, ``configure_pool`` workers."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=_max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+class SharedMatrix:
+    """
+    Copy of a matrix in shared memory for the lifetime of a ``with`` block.
+
+    Workers receive ``ref`` (a few bytes) instead of a pickled matrix and map it
+    with ``attach_matrix``. ``array`` is the owner's writable view, e.g. for
+    flags the workers poll.
+    """
+
+    def __init__(self, matrix: np.ndarray):
+        matrix = np.ascontiguousarray(matrix)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        self.array = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=self._shm.buf)
+        self.array[...] = matrix
+        self.ref: MatrixRef = (self._shm.name, matrix.shape, matrix.dtype.str)
+
+    def __enter__(self) -> "SharedMatrix":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+
+def attach_matrix(ref: MatrixRef) -> np.ndarray:
+    """Read-only view of a ``SharedMatrix`` inside a worker (cached per process)."""
+    name, shape, dtype = ref
+    if name not in _attached:
+        # Only the most recent segments are kept mapped, oldest dropped first
+        while len(_attached) >= _MAX_ATTACHED:
+            shm, matrix = _attached.pop(next(iter(_attached)))
+            del matrix
+            shm.close()
+
+        shm = shared_memory.SharedMemory(name=name)
+        matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        matrix.flags.writeable = False
+        _attached[name] = (shm, matrix)
+    return _attached[name][1]
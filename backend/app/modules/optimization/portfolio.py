@@ -0,0 +1,102 @@
+import time
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from .budget import SolveBudget
+from .nn import _path_cost
+from .parallel import MatrixRef, SharedMatrix, attach_matrix, get_pool
+
+# Solver signature shared by everything in this package
+Solver = Callable[..., List[int]]
+
+def portfolio_solve(
+    dist_mx: np.ndarray,
+    solvers: Dict[str, Solver],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    target_cost: Optional[float] = None,
+    exact: Tuple[str, ...] = ("exact",),
+    budget: Optional[SolveBudget] = None
+) -> Tuple[List[int], str, Dict[str, Optional[float]]]:
+    """
+    Race ``solvers`` on the same instance in the shared process pool.
+
+    All runs share the deadline of ``budget``. As soon as one returns a route
+    costing at most ``target_cost`` (the budget's by default, e.g. close
+    enough to a lower bound), or a
+    solver named in ``exact`` finishes, the others are cancelled through a
+    shared flag they poll with their budget. Returns the best route, the name
+    of the solver that found it and the cost each solver reached (``None`` if
+    it never ran or failed).
+    """
+    budget = budget or SolveBudget()
+    if target_cost is None:
+        target_cost = budget.target_cost
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    # Wall-clock deadline so runs that wait for a free worker don't get extra time
+    deadline = None if budget.deadline is None else time.time() + budget.remaining_ms() / 1000
+
+    results: Dict[str, Optional[float]] = {name: None for name in solvers}
+    errors: Dict[str, Exception] = {}
+    best: Tuple[float, Optional[List[int]], Optional[str]] = (np.inf, None, None)
+
+    pool = get_pool()
+    with SharedMatrix(dist_mx) as shared, SharedMatrix(np.zeros(1, dtype=np.int8)) as stop:
+        pending = {
+            pool.submit(_run_solver, shared.ref, stop.ref, solver, start, end, return_to_start,
+                        deadline, target_cost): name
+            for name, solver in solvers.items()
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    route, iterations, converged = future.result()
+                except Exception as e:
+                    # A solver that fails (e.g. the instance is too big for it) leaves the others racing
+                    errors[name] = e
+                    continue
+                if route is None:
+                    continue
+                cost = _path_cost(route, dist_mx)
+                results[name] = cost
+                budget.iterations += iterations
+                if cost < best[0]:
+                    best = (cost, route, name)
+                    budget.converged = converged
+                if (target_cost is not None and cost <= target_cost) or (name in exact and converged):
+                    # Queued runs are dropped; running ones see the flag at their
+                    # next budget check and still report their best route so far
+                    stop.array[0] = 1
+                    for other in pending:
+                        other.cancel()
+
+    cost, route, winner = best
+    if route is None:
+        failed = "; ".join(f"{name}: {e}" for name, e in errors.items())
+        raise RuntimeError("No solver in the portfolio returned a route" + (f" ({failed})" if failed else ""))
+    return route, winner, results
+
+def _run_solver(
+    matrix_ref: MatrixRef,
+    stop_ref: MatrixRef,
+    solver: Solver,
+    start: Optional[int],
+    end: Optional[int],
+    return_to_start: bool,
+    deadline: Optional[float],
+    target_cost: Optional[float] = None
+) -> Tuple[Optional[List[int]], int, bool]:
+    """Worker entry point: one solver run, as (route, iterations, converged)"""
+    stop = attach_matrix(stop_ref)
+    remaining = None if deadline is None else (deadline - time.time()) * 1000
+    if stop[0] or (remaining is not None and remaining <= 0):
+        return None, 0, False
+
+    budget = SolveBudget(remaining, cancel=stop, target_cost=target_cost)
+    route = solver(attach_matrix(matrix_ref), start, end, return_to_start, budget=budget)
+    return route, budget.iterations, budget.converged
@@ -0,0 +1,119 @@
+import numpy as np
+from typing import List, Optional
+
+class ClosedTourProblem:
+    """
+    A route request rewritten as a closed tour from ``anchor`` over ``matrix``.
+
+    Every start/end variant becomes the same problem, so a solver runs once on
+    a round trip ``[anchor, ..., anchor]`` instead of trying every possible
+    start, and ``restore`` maps that tour back to a route in original indices:
+
+    - round trips keep the matrix; a fixed end is rotated to just before the
+      return leg
+    - open routes get a dummy anchor stop with free legs to the stops the path
+      may start or end at and a prohibitive cost to every other stop, so a
+      symmetric matrix stays symmetric (both ends open: free legs to all stops)
+
+    Asymmetric matrices with a fixed end use a smaller form instead:
+
+    - fixed start, open end: legs back into the start are free
+    - open start, fixed end: legs out of the end are free
+    - fixed start and end: the end is merged into the start (arriving at the
+      merged stop costs what arriving at the end does)
+    """
+
+    def __init__(self, dist_mx: np.ndarray, start: Optional[int] = None, end: Optional[int] = None,
+                 return_to_start: bool = False):
+        dist_mx = np.asarray(dist_mx, dtype=float)
+        n = dist_mx.shape[0]
+        self.n = n
+        self.start = start
+        self.end = end if end is not None and end != start else None
+        self.return_to_start = return_to_start
+        self.nodes = np.arange(n)      # original index of each matrix row
+        self.offset = 0.0              # route cost minus tour cost
+        symmetric = np.array_equal(dist_mx, dist_mx.T)
+
+        if return_to_start and (start is None or self.end is None):
+            self.kind = "closed"
+            self.matrix = dist_mx
+            self.anchor = start if start is not None else 0
+        elif symmetric or (start is None and self.end is None):
+            self.kind = "dummy"
+            ends = [i for i in (start, self.end) if i is not None]
+            # Dearer than any whole path, so no tour leaves the dummy through another stop
+            prohibitive = float(dist_mx.max(initial=0.0)) * n + 1.0 if ends else 0.0
+            legs = np.full(n, prohibitive)
+            legs[ends] = 0.0
+            self.matrix = np.zeros((n + 1, n + 1))
+            self.matrix[:n, :n] = dist_mx
+            self.matrix[n, :n] = self.matrix[:n, n] = legs
+            self.anchor = n
+            # A single fixed end leaves the dummy through one prohibitive leg
+            self.offset = -prohibitive if len(ends) == 1 else 0.0
+            if return_to_start:
+                self.offset += float(dist_mx[self.end, start])
+        elif start is not None and self.end is not None:
+            self.kind = "merged"
+            self.nodes = np.array([i for i in range(n) if i != self.end], dtype=np.intp)
+            self.matrix = dist_mx[np.ix_(self.nodes, self.nodes)]
+            anchor = int(np.searchsorted(self.nodes, start))
+            self.matrix[:, anchor] = dist_mx[self.nodes, self.end]
+            self.matrix[anchor, anchor] = 0.0
+            self.anchor = anchor
+            if return_to_start:
+                self.offset = float(dist_mx[self.end, start])
+        elif start is not None:
+            self.kind = "open_end"
+            self.matrix = dist_mx.copy()
+            self.matrix[:, start] = 0.0
+            self.anchor = start
+        else:
+            self.kind = "open_start"
+            self.matrix = dist_mx.copy()
+            self.matrix[self.end, :] = 0.0
+            self.anchor = self.end
+
+    @property
+    def free_stops(self) -> int:
+        """Stops the closed tour orders besides the anchor"""
+        return self.matrix.shape[0] - 1
+
+    def restore(self, tour: List[int]) -> List[int]:
+        """Route in original indices for a closed ``tour`` over ``matrix``"""
+        cycle = _rotate(list(tour[:-1]) if len(tour) > 1 and tour[0] == tour[-1] else list(tour), self.anchor)
+        if self.kind == "merged":
+            route = [int(x) for x in self.nodes[cycle]] + [self.end]
+            return route + [self.start] if self.return_to_start else route
+        if self.kind == "closed":
+            if self.start is None and self.end is not None and len(cycle) > 1:
+                # Rotate so the fixed end is last before returning
+                cycle = _rotate(cycle, cycle[(cycle.index(self.end) + 1) % len(cycle)])
+            return cycle + cycle[:1]
+        if self.kind == "open_end":
+            return cycle
+        if self.kind == "open_start":
+            return cycle[1:] + cycle[:1]
+        return self._orient(cycle[1:])
+
+    def _orient(self, route: List[int]) -> List[int]:
+        """Dummy-form path read in the direction that starts at ``start`` and ends at ``end``"""
+        if not route:
+            return route
+        if (self.start is not None and route[-1] == self.start) or (self.end is not None and route[0] == self.end):
+            route.reverse()
+        # A tour cut short while still using a prohibitive leg: move the fixed ends into place
+        if self.start is not None and route[0] != self.start:
+            route.remove(self.start)
+            route.insert(0, self.start)
+        if self.end is not None and route[-1] != self.end:
+            route.remove(self.end)
+            route.append(self.end)
+        if self.return_to_start:
+            route.append(route[0])
+        return route
+
+def _rotate(cycle: List[int], first: int) -> List[int]:
+    i = cycle.index(first)
+    return cycle[i:] + cycle[:i]
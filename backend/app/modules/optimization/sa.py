@@ -0,0 +1,172 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from .budget import SolveBudget
+from .local_search import _local_search_descent
+from .nn import nearest_neighbor
+from .two_opt import _EPS, _is_symmetric, _movable_range, _neighbor_lists
+
+def simulated_annealing(
+    dist_mx: np.ndarray,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    steps: Optional[int] = None,
+    batch: int = 32,
+    neighbor_k: int = 8,
+    seed: Optional[int] = None,
+    budget: Optional[SolveBudget] = None
+) -> List[int]:
+    """
+    Simulated annealing with batched 2-opt / Or-opt move evaluation.
+
+    Every step draws ``batch`` candidate moves (reversals and relocations of 1-3
+    stops next to a neighbor-list stop; random numbers are drawn for many steps
+    at a time) and prices them all at once with NumPy:
+    endpoint legs are gathered from the matrix and reversed segment costs come
+    from prefix sums, so asymmetric matrices are priced exactly. One of the
+    moves passing the Metropolis test is applied. The temperature falls
+    geometrically with progress, measured against ``budget``'s deadline when
+    there is one and against ``steps`` (default ``50 * n``) otherwise. The best
+    route seen is polished with a local search descent.
+    """
+    budget = budget or SolveBudget()
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    initial = nearest_neighbor(dist_mx, start, end, return_to_start, budget)
+    n = dist_mx.shape[0]
+    lo, hi = _movable_range(initial, start, end, return_to_start)
+    if len(initial) <= 3 or hi - lo < 1:
+        budget.converged = True
+        return initial
+
+    rng = np.random.default_rng(seed)
+    if steps is None:
+        steps = min(100_000, 50 * n)
+
+    # Padded with a zero-cost stop at both ends so open paths have neighbors
+    Dp = np.zeros((n + 1, n + 1))
+    Dp[:n, :n] = dist_mx
+    ext = np.array([n] + initial + [n], dtype=np.intp)
+    lo, hi = lo + 1, hi + 1
+    pos = np.empty(n + 1, dtype=np.intp)
+    pos[ext[::-1]] = np.arange(len(ext))[::-1]      # first occurrence wins
+    nearest = _neighbor_lists(dist_mx, neighbor_k)
+    # The padding stop's "neighbors" are arbitrary: any stop may become the first
+    neighbors = np.array(nearest + [list(range(len(nearest[0])))], dtype=np.intp)
+    symmetric = _is_symmetric(dist_mx)
+
+    F, B = _prefix(ext, Dp, symmetric)
+    cost = best_cost = F[-1]
+    best = ext.copy()
+    t_start = _initial_temperature(ext, Dp, F, B, pos, neighbors, lo, hi, batch, rng)
+    t_end = t_start * 1e-3
+
+    # Anneal within most of the time left, keeping some for the final polish
+    remaining = budget.remaining_ms()
+    anneal = SolveBudget(None if remaining is None else 0.9 * remaining, cancel=budget.cancel,
+                         target_cost=budget.target_cost)
+
+    done = 0
+    chunk = 256
+    while done < steps and not anneal.expired() and not anneal.reached(best_cost):
+        if done % chunk == 0:
+            draws = _draw(rng, lo, hi, neighbors.shape[1], batch, chunk)
+            progress = done / steps
+            if anneal.deadline is not None:
+                progress = max(progress, anneal.elapsed_ms() / anneal.time_limit_ms)
+            temperature = t_start * (t_end / t_start) ** min(1.0, progress)
+        first, rank, extra, uniform, pick = (d[done % chunk] for d in draws)
+        done += 1
+
+        moves, delta = _candidates(ext, Dp, F, B, pos, neighbors, lo, hi, first, rank, extra)
+        accepted = np.flatnonzero(uniform < np.exp(-np.maximum(delta, 0) / temperature))
+        if len(accepted) == 0:
+            continue
+
+        m = accepted[int(pick * len(accepted))]
+        _apply(ext, pos, *(int(x[m]) for x in moves))
+        F, B = _prefix(ext, Dp, symmetric)
+        cost = F[-1]
+        if cost < best_cost - _EPS:
+            best, best_cost = ext.copy(), cost
+
+    budget.iterations += done
+    converged = done == steps or budget.reached(best_cost)
+
+    tour = best[1:-1].tolist()
+    _local_search_descent(tour, dist_mx.tolist(), nearest, lo - 1, hi - 1,
+                          symmetric=symmetric, max_evals=10 * len(tour), budget=budget)
+    budget.converged = converged
+    return tour
+
+def _prefix(ext: np.ndarray, Dp: np.ndarray, symmetric: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Cumulative leg costs along ``ext`` forwards and, for asymmetric costs, backwards"""
+    F = np.concatenate([[0.0], np.cumsum(Dp[ext[:-1], ext[1:]])])
+    B = F if symmetric else np.concatenate([[0.0], np.cumsum(Dp[ext[1:], ext[:-1]])])
+    return F, B
+
+def _draw(rng: np.random.Generator, lo: int, hi: int, k: int, batch: int, steps: int) -> Tuple[np.ndarray, ...]:
+    """
+    Random numbers for ``steps`` steps of ``batch`` candidates (half reversals,
+    half relocations) drawn at once: first position, neighbor rank, segment
+    length, the Metropolis uniform and which accepted move to apply, one row
+    per step.
+    """
+    return (rng.integers(lo, hi + 1, (steps, batch)), rng.integers(0, k, (steps, batch)),
+            rng.integers(0, 3, (steps, batch)), rng.random((steps, batch)), rng.random(steps))
+
+def _candidates(ext: np.ndarray, Dp: np.ndarray, F: np.ndarray, B: np.ndarray, pos: np.ndarray,
+                neighbors: np.ndarray, lo: int, hi: int, first: np.ndarray, rank: np.ndarray,
+                extra: np.ndarray) -> Tuple[Tuple[np.ndarray, ...], np.ndarray]:
+    """
+    Candidate moves from one row of ``_draw`` as (kind, i, j, p) arrays with their
+    cost deltas; invalid draws get ``inf``. kind 0 reverses ``ext[i..j]``; kind 1
+    moves ``ext[i..j]`` between positions ``p`` and ``p + 1``.
+    """
+    half = len(first) // 2
+    reverse = np.arange(len(first)) < half
+
+    # 2-opt: new leg ext[i - 1] -> neighbor c by reversing ext[i .. pos[c]]
+    # Or-opt: ext[i .. i + extra] moved right after neighbor c of its first stop
+    i = first
+    c = neighbors[np.where(reverse, ext[i - 1], ext[i]), rank]
+    target = pos[c]
+    j = np.where(reverse, target, i + extra)
+    p = np.where(reverse, 0, target)
+    ok = np.where(reverse, j > i, (p >= lo - 1) & ((p < i - 1) | (p > j))) & (j <= hi) & (p <= hi)
+    j = np.where(ok, j, i)
+    p = np.where(ok, p, lo - 1)
+
+    a, s1, s2, b = ext[i - 1], ext[i], ext[j], ext[j + 1]
+    reversal = (Dp[a, s2] + Dp[s1, b] - Dp[a, s1] - Dp[s2, b]
+                + (B[j] - B[i]) - (F[j] - F[i]))
+    e = ext[p + 1]
+    relocation = (Dp[a, b] + Dp[c, s1] + Dp[s2, e]
+                  - Dp[a, s1] - Dp[s2, b] - Dp[c, e])
+    delta = np.where(ok, np.where(reverse, reversal, relocation), np.inf)
+    return (np.where(reverse, 0, 1), i, j, p), delta
+
+def _apply(ext: np.ndarray, pos: np.ndarray, kind: int, i: int, j: int, p: int) -> None:
+    """Apply a move from ``_candidates`` to ``ext`` and ``pos`` in place"""
+    if kind == 0:
+        ext[i:j + 1] = ext[i:j + 1][::-1].copy()
+        lo, hi = i, j
+    else:
+        segment = ext[i:j + 1].copy()
+        if p < i:
+            ext[p + 1:j + 1] = np.concatenate([segment, ext[p + 1:i]])
+            lo, hi = p + 1, j
+        else:
+            ext[i:p + 1] = np.concatenate([ext[j + 1:p + 1], segment])
+            lo, hi = i, p
+    pos[ext[lo:hi + 1]] = np.arange(lo, hi + 1)
+
+def _initial_temperature(ext: np.ndarray, Dp: np.ndarray, F: np.ndarray, B: np.ndarray, pos: np.ndarray,
+                         neighbors: np.ndarray, lo: int, hi: int, batch: int,
+                         rng: np.random.Generator) -> float:
+    """Temperature accepting a typical uphill move from the start route about half the time"""
+    first, rank, extra, _, _ = _draw(rng, lo, hi, neighbors.shape[1], 8 * batch, 1)
+    _, delta = _candidates(ext, Dp, F, B, pos, neighbors, lo, hi, first[0], rank[0], extra[0])
+    uphill = delta[np.isfinite(delta) & (delta > 0)]
+    if len(uphill) == 0:
+        return 1.0
+    return float(np.median(uphill) / np.log(2))
@@ -0,0 +1,41 @@
+from typing import Optional
+from .held_karp import MAX_FREE_STOPS, free_stop_count
+
+# Rough single-core cost models (ms), measured on random Euclidean instances
+_EXACT_MS_PER_STATE = 6e-6      # per (subset, last stop, predecessor) of Held-Karp
+_LS_MS_PER_CELL = 4e-4          # NN + local search descent, per distance matrix cell
+
+# Without a time limit, iterated LK's default kicks stay around a second up to here
+LK_MAX_STOPS = 200
+
+def select_algo(
+    n: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    return_to_start: bool = False,
+    time_limit_ms: Optional[float] = None,
+    exact_max_stops: int = MAX_FREE_STOPS
+) -> str:
+    """
+    Pick the cheapest solver expected to reach near-best quality for an instance.
+
+    Held-Karp is used while the stops between the fixed ends are few enough and
+    its DP fits in the budget; otherwise iterated LK when there is time for kicks
+    on top of a local search descent, local search (``ls``) when only the descent
+    fits, and plain ``nn2opt`` for very tight budgets.
+    """
+    free = free_stop_count(n, start, end, return_to_start)
+
+    if free <= min(exact_max_stops, MAX_FREE_STOPS):
+        exact_ms = (1 << free) * free * free * _EXACT_MS_PER_STATE
+        if time_limit_ms is None or exact_ms <= time_limit_ms:
+            return "exact"
+
+    ls_ms = n * n * _LS_MS_PER_CELL
+    if time_limit_ms is None:
+        return "lk" if n <= LK_MAX_STOPS else "ls"
+    if time_limit_ms >= 2 * ls_ms:
+        return "lk"
+    if time_limit_ms >= ls_ms:
+        return "ls"
+    return "nn2opt"
@@ -1,6 +1,12 @@
 import numpy as np
-from typing import List, Optional
-from .nn import nearest_neighbor, _path_cost
+from collections import deque
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple
+from .nn import nearest_neighbor
+from .budget import SolveBudget
+
+# Improvements smaller than this are treated as float noise
+_EPS = 1e-9
 
 def two_opt(
     path: List[int],
@@ -8,83 +14,257 @@ def two_opt(
     start: Optional[int] = None,
     end: Optional[int] = None,
     return_to_start: bool = False,
-    max_passes: int = 50
+    max_passes: int = 50,
+    neighbor_k: int = 10,
+    budget: Optional[SolveBudget] = None
 ) -> List[int]:
     """
-    2-opt optimization with support for fixed start/end points
+    2-opt optimization with support for fixed start/end points.
+
+    Segment reversals are scored in O(1) from edge costs plus prefix sums of the
+    forward and backward leg costs (so asymmetric matrices stay exact), candidate
+    moves come from ``neighbor_k`` nearest-neighbor lists and don't-look bits
+    skip nodes whose surroundings have not changed. ``max_passes`` caps the work
+    at that many node evaluations per route position; ``budget`` stops it early
+    with the best route so far.
     """
+    budget = budget or SolveBudget()
     if len(path) <= 3:
+        budget.converged = True
         return path
-    
-    best = path[:]
-    improved = True
-    passes = 0
-    
-    # Determine fixed positions based on constraints
-    fixed_positions = set()
-    if start is not None:
-        fixed_positions.add(0)  # Start is fixed at position 0
-    if end is not None and not return_to_start:
-        fixed_positions.add(len(best) - 1)  # End is fixed at last position
-    
-    while improved and passes < max_passes:
-        improved = False
-        passes += 1
-        
-        for i in range(1, len(best) - 2):
-            if i in fixed_positions:
-                continue
-                
-            for k in range(i + 1, len(best) - 1):
-                if k in fixed_positions:
-                    continue
-                
-                # Don't break fixed segments
-                if _would_break_fixed(best, i, k, fixed_positions):
-                    continue
-                
-                new_route = _two_opt_swap(best, i, k)
-                if _path_cost(new_route, dist_mx) < _path_cost(best, dist_mx):
-                    best = new_route
-                    improved = True
-                    break
-            
-            if improved:
-                break
-    
-    return best
-
-def _would_break_fixed(path: List[int], i: int, k: int, fixed_positions: set) -> bool:
-    """Check if a 2-opt swap would break fixed positions"""
-    # Check if swap would move fixed positions
-    for pos in fixed_positions:
-        if pos >= i and pos <= k:
-            return True
-    return False
-
-def _two_opt_swap(route: List[int], i: int, k: int) -> List[int]:
-    """Perform 2-opt swap between positions i and k"""
-    return route[:i] + route[i:k+1][::-1] + route[k+1:]
+
+    dist_mx = np.asarray(dist_mx, dtype=float)
+    tour = list(path)
+    lo, hi = _movable_range(tour, start, end, return_to_start)
+    if hi - lo < 1:
+        budget.converged = True
+        return tour
+
+    _two_opt_descent(
+        tour,
+        dist_mx.tolist(),
+        _neighbor_lists(dist_mx, neighbor_k),
+        lo,
+        hi,
+        symmetric=_is_symmetric(dist_mx),
+        max_evals=max_passes * len(tour),
+        budget=budget
+    )
+    return tour
+
+def _two_opt_descent(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    lo: int,
+    hi: int,
+    symmetric: bool = False,
+    queue: Optional[Iterable[int]] = None,
+    max_evals: Optional[int] = None,
+    budget: Optional[SolveBudget] = None
+) -> int:
+    """
+    Apply improving 2-opt moves to ``tour`` in place until no node yields one.
+
+    Only positions ``lo..hi`` may change. ``queue`` seeds the don't-look bits
+    (defaults to every node on the route). Moves are counted in ``budget``,
+    which is marked converged if the queue empties before its deadline.
+    Returns the number of moves applied.
+    """
+    L = len(tour)
+    closed = L > 1 and tour[0] == tour[-1]
+    pos = _positions(tour, len(D))
+    F, B = _prefix_costs(tour, D, symmetric)
+
+    queue = deque(tour if queue is None else queue)
+    active = set(queue)
+    evals = moves = 0
+
+    while queue:
+        if max_evals is not None and evals >= max_evals:
+            break
+        if budget is not None and budget.expired():
+            break
+        evals += 1
+        a = queue.popleft()
+        active.discard(a)
+
+        move = _best_two_opt_move(tour, D, neighbors, pos, F, B, a, lo, hi, closed)
+        if move is None:
+            continue
+
+        i, k = move
+        touched = {tour[i - 1] if i > 0 else None, tour[i], tour[k],
+                   tour[k + 1] if k < L - 1 else None}
+        _reverse(tour, pos, i, k)
+        F, B = _prefix_costs(tour, D, symmetric)
+        moves += 1
+
+        for node in touched:
+            if node is not None and node not in active:
+                active.add(node)
+                queue.append(node)
+
+    if budget is not None:
+        budget.iterations += moves
+        budget.converged = not queue
+    return moves
+
+def _best_two_opt_move(
+    tour: List[int],
+    D: List[List[float]],
+    neighbors: List[List[int]],
+    pos: List[int],
+    F: List[float],
+    B: List[float],
+    a: int,
+    lo: int,
+    hi: int,
+    closed: bool
+) -> Optional[Tuple[int, int]]:
+    """Best improving reversal ``(i, k)`` that adds an edge at node ``a``, if any."""
+    L = len(tour)
+    best_gain, best_move = _EPS, None
+    p_out = pos[a]                                  # a as tour[i - 1]
+    p_in = L - 1 if closed and a == tour[0] else p_out  # a as tour[k + 1]
+
+    # a's outgoing edge a -> a' is replaced: with c after a reverse a'..c (new
+    # edges a -> c, a' -> c'), with c before a reverse c'..a (c -> a, c' -> a')
+    old = D[a][tour[p_out + 1]] if p_out + 1 < L else float("inf")
+    for c in neighbors[a]:
+        if min(D[a][c], D[c][a]) >= old:
+            break
+        k = pos[c]
+        if k > p_out:
+            i, j = p_out + 1, k
+            new = D[a][c]
+        else:
+            i, j = k + 1, p_out
+            new = D[c][a]
+        if new < old and lo <= i < j <= hi:
+            gain = _reversal_gain(tour, D, F, B, i, j)
+            if gain > best_gain:
+                best_gain, best_move = gain, (i, j)
+
+    # a's incoming edge a_ -> a is replaced: with c before a reverse c..a_ (new
+    # edges c_ -> a_, c -> a), with c after a reverse a..c_ (a_ -> c_, a -> c)
+    old = D[tour[p_in - 1]][a] if p_in > 0 else float("inf")
+    for c in neighbors[a]:
+        if min(D[a][c], D[c][a]) >= old:
+            break
+        k = pos[c]
+        if k < p_in:
+            i, j = k, p_in - 1
+            new = D[c][a]
+        else:
+            i, j = p_in, k - 1
+            new = D[a][c]
+        if new < old and lo <= i < j <= hi:
+            gain = _reversal_gain(tour, D, F, B, i, j)
+            if gain > best_gain:
+                best_gain, best_move = gain, (i, j)
+
+    # Free path ends: flip the whole prefix before a or suffix after it
+    if lo == 0 and 0 < p_in - 1 <= hi:
+        gain = _reversal_gain(tour, D, F, B, 0, p_in - 1)
+        if gain > best_gain:
+            best_gain, best_move = gain, (0, p_in - 1)
+    if hi == L - 1 and lo <= p_out + 1 < hi:
+        gain = _reversal_gain(tour, D, F, B, p_out + 1, L - 1)
+        if gain > best_gain:
+            best_gain, best_move = gain, (p_out + 1, L - 1)
+
+    return best_move
+
+def _reversal_gain(tour: List[int], D: List[List[float]], F: List[float], B: List[float], i: int, k: int) -> float:
+    """Cost saved by reversing ``tour[i..k]``; O(1) via the prefix sums."""
+    L = len(tour)
+    gain = (F[k] - F[i]) - (B[k] - B[i])
+    if i > 0:
+        gain += D[tour[i - 1]][tour[i]] - D[tour[i - 1]][tour[k]]
+    if k < L - 1:
+        gain += D[tour[k]][tour[k + 1]] - D[tour[i]][tour[k + 1]]
+    return gain
+
+def _reverse(tour: List[int], pos: List[int], i: int, k: int) -> None:
+    """Reverse ``tour[i..k]`` in place and refresh the position index."""
+    tour[i:k + 1] = tour[k:i - 1 if i > 0 else None:-1]
+    for j in range(i, k + 1):
+        pos[tour[j]] = j
+
+def _positions(tour: List[int], n: int) -> List[int]:
+    """Position of every node on the route (first occurrence for closed tours)."""
+    pos = [-1] * n
+    for j in range(len(tour) - 1, -1, -1):
+        pos[tour[j]] = j
+    return pos
+
+def _prefix_costs(tour: List[int], D: List[List[float]], symmetric: bool) -> Tuple[List[float], List[float]]:
+    """Prefix sums of forward and backward leg costs along the route."""
+    F = list(accumulate((D[tour[j]][tour[j + 1]] for j in range(len(tour) - 1)), initial=0.0))
+    if symmetric:
+        return F, F
+    B = list(accumulate((D[tour[j + 1]][tour[j]] for j in range(len(tour) - 1)), initial=0.0))
+    return F, B
+
+def _neighbor_lists(dist_mx: np.ndarray, k: int) -> List[List[int]]:
+    """
+    The ``k`` nearest nodes to each node by round-trip cost, closest first.
+
+    A node at the same cost from every other node (the free dummy stop of an
+    open route) would fill every list without saying which stops are close,
+    so it is ranked after all others.
+    """
+    n = dist_mx.shape[0]
+    k = max(0, min(k, n - 1))
+    if k == 0:
+        return [[] for _ in range(n)]
+
+    sym = dist_mx + dist_mx.T
+    np.fill_diagonal(sym, np.inf)
+    uniform = sym.min(axis=1) == np.where(np.isinf(sym), -np.inf, sym).max(axis=1)
+    if uniform.any() and not uniform.all():
+        sym[:, uniform] = np.inf
+    nearest = np.argpartition(sym, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(sym, nearest, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(nearest, order, axis=1).tolist()
+
+def _movable_range(path: List[int], start: Optional[int], end: Optional[int], return_to_start: bool) -> Tuple[int, int]:
+    """First and last route positions a move may touch under the start/end constraints."""
+    L = len(path)
+    closed = L > 1 and path[0] == path[-1]
+    lo = 1 if closed or start is not None else 0
+    hi = L - 2 if closed or end is not None else L - 1
+
+    # Fixed end on a round trip sits just before the closing leg
+    if closed and end is not None and end != path[0] and path[-2] == end:
+        hi = L - 3
+
+    return lo, hi
+
+def _is_symmetric(dist_mx: np.ndarray) -> bool:
+    return bool(np.array_equal(dist_mx, dist_mx.T))
 
 def two_opt_optimize(
     dist_mx: np.ndarray,
     start: Optional[int] = None,
     end: Optional[int] = None,
     return_to_start: bool = False,
-    max_passes: int = 50
+    max_passes: int = 50,
+    budget: Optional[SolveBudget] = None
 ) -> List[int]:
     """
     Complete 2-opt optimization from scratch
     """
     # First get a good initial solution using NN
     if start is not None and end is not None:
-        initial = nearest_neighbor(dist_mx, start, end, return_to_start)
+        initial = nearest_neighbor(dist_mx, start, end, return_to_start, budget)
     elif start is not None:
-        initial = nearest_neighbor(dist_mx, start, None, return_to_start)
+        initial = nearest_neighbor(dist_mx, start, None, return_to_start, budget)
     elif end is not None:
-        initial = nearest_neighbor(dist_mx, None, end, return_to_start)
+        initial = nearest_neighbor(dist_mx, None, end, return_to_start, budget)
     else:
-        initial = nearest_neighbor(dist_mx, None, None, return_to_start)
-    
+        initial = nearest_neighbor(dist_mx, None, None, return_to_start, budget)
+
     # Apply 2-opt optimization
-    return two_opt(initial, dist_mx, start, end, return_to_start, max_passes)
\ No newline at end of file
+    return two_opt(initial, dist_mx, start, end, return_to_start, max_passes, budget=budget)
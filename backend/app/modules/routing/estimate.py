@@ -0,0 +1,97 @@
+import threading
+from typing import Dict, List, Tuple
+import numpy as np
+from app.schemas.places import Place
+from app.modules.optimization.matrix import CostMatrix
+
+# Mean Earth radius (IUGG), meters
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray, lat2: np.ndarray = None, lon2: np.ndarray = None) -> np.ndarray:
+    """
+    Great-circle distances in meters from the points (``lat``, ``lon``), in
+    degrees, to the points (``lat2``, ``lon2``) (default: the same points)
+    """
+    phi = np.radians(np.asarray(lat, dtype=float))[:, None]
+    lam = np.radians(np.asarray(lon, dtype=float))[:, None]
+    phi2 = phi.T if lat2 is None else np.radians(np.asarray(lat2, dtype=float))[None, :]
+    lam2 = lam.T if lon2 is None else np.radians(np.asarray(lon2, dtype=float))[None, :]
+
+    h = np.sin((phi2 - phi) / 2) ** 2 + np.cos(phi) * np.cos(phi2) * np.sin((lam2 - lam) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+class RoadEstimator:
+    """
+    Road distance and duration estimates from straight-line geometry.
+
+    Distances are great-circle distances times a detour factor, durations
+    those distances over an average speed. Both factors start from the given
+    defaults and are calibrated from real OSRM legs passed to ``observe``
+    (ratios of sums, so long legs weigh more); legs shorter than
+    ``min_leg_meters`` are ignored, their detour is mostly noise. The
+    calibrated factors replace the defaults once ``min_samples`` legs were seen.
+    """
+
+    def __init__(self, detour_factor: float, speed_mps: float, min_leg_meters: float = 200.0,
+                 min_samples: int = 100):
+        self.default_detour = detour_factor
+        self.default_speed = speed_mps
+        self.min_leg_meters = min_leg_meters
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._great_circle = 0.0
+        self._road = 0.0
+        self._timed_road = 0.0
+        self._seconds = 0.0
+
+    def factors(self) -> Tuple[float, float]:
+        """Current (detour factor, speed in m/s)"""
+        with self._lock:
+            if self._samples < self.min_samples or self._great_circle <= 0 or self._seconds <= 0:
+                return self.default_detour, self.default_speed
+            return self._road / self._great_circle, self._timed_road / self._seconds
+
+    def observe(self, sources: np.ndarray, destinations: np.ndarray,
+                distances: np.ndarray, durations: np.ndarray) -> None:
+        """
+        Calibrate from a block of OSRM legs: ``sources`` and ``destinations``
+        are (lat, lon) arrays for its rows and columns; unroutable legs are skipped
+        """
+        great_circle = haversine_matrix(sources[:, 0], sources[:, 1], destinations[:, 0], destinations[:, 1])
+        distances = np.asarray(distances, dtype=float)
+        durations = np.asarray(durations, dtype=float)
+        usable = (great_circle >= self.min_leg_meters) & np.isfinite(distances) & np.isfinite(durations)
+        usable &= distances >= great_circle * 0.9   # snapping can shave a little off, not more
+        if not usable.any():
+            return
+
+        gc, road, seconds = great_circle[usable], distances[usable], durations[usable]
+        timed = seconds > 0
+        with self._lock:
+            self._samples += int(usable.sum())
+            self._great_circle += float(gc.sum())
+            self._road += float(road.sum())
+            self._timed_road += float(road[timed].sum())
+            self._seconds += float(seconds[timed].sum())
+
+    def estimate(self, places: List[Place]) -> Tuple[CostMatrix, CostMatrix]:
+        """Estimated distance (meters) and duration (seconds) matrices, symmetric and packed"""
+        detour, speed = self.factors()
+        coords = np.array([[p.latitude, p.longitude] for p in places], dtype=float).reshape(-1, 2)
+        distances = haversine_matrix(coords[:, 0], coords[:, 1]) * detour
+        durations = distances / speed
+        return CostMatrix.from_rows(distances), CostMatrix.from_rows(durations)
+
+    def stats(self) -> Dict[str, float]:
+        detour, speed = self.factors()
+        with self._lock:
+            samples = self._samples
+        return {
+            "detour_factor": round(detour, 4),
+            "speed_kmh": round(speed * 3.6, 2),
+            "samples": samples,
+            "calibrated": samples >= self.min_samples,
+        }
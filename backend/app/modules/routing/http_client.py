@@ -0,0 +1,71 @@
+import asyncio
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.config.settings import OSRM_KEEPALIVE_SECONDS, OSRM_MAX_CONNECTIONS, OSRM_MAX_KEEPALIVE, OSRM_TIMEOUT_SECONDS
+
+# One pooled client (and per-host semaphores) per event loop; uvicorn runs one
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _state() -> Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]:
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        client = httpx.AsyncClient(
+            timeout=OSRM_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=OSRM_MAX_CONNECTIONS,
+                max_keepalive_connections=OSRM_MAX_KEEPALIVE,
+                keepalive_expiry=OSRM_KEEPALIVE_SECONDS,
+            ),
+        )
+        _clients[loop] = (client, {})
+    return _clients[loop]
+
+
+async def get_json(url: str, max_concurrency: Optional[int] = None) -> Any:
+    """
+    GET ``url`` on the shared keep-alive client and decode the JSON body.
+    At most ``max_concurrency`` requests per host are in flight at once; the
+    first cap given for a host sticks.
+    """
+    client, host_limits = _state()
+    # urlsplit is cheap; httpx.URL validates every character of these long table URLs
+    host = urlsplit(url).hostname
+    if max_concurrency is not None and host not in host_limits:
+        host_limits[host] = asyncio.Semaphore(max_concurrency)
+
+    limit = host_limits.get(host)
+    if limit is None:
+        response = await client.get(url)
+    else:
+        async with limit:
+            response = await client.get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_status(url: str, timeout: float) -> int:
+    """HTTP status of a GET to ``url`` on the shared client, within ``timeout`` seconds"""
+    client, _ = _state()
+    response = await client.get(url, timeout=timeout)
+    return response.status_code
+
+
+async def open_client() -> None:
+    """Create the running loop's client up front (building its SSL context takes ~0.1 s)"""
+    _state()
+
+
+async def close_clients() -> None:
+    """Close the clients of the running loop (e.g. on application shutdown)"""
+    state = _clients.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state[0].aclose()
+
+
+def table_too_big(status_code: int, body: str) -> bool:
+    """Whether an OSRM response rejects the request for its size (TooBig, or the URL was too long)"""
+    return status_code == 414 or (status_code == 400 and '"TooBig"' in body)
@@ -1,23 +1,56 @@
-import requests
+import httpx
+import numpy as np
 from app.schemas.places import Place
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from app.modules.routing.http_client import get_json, get_status, table_too_big
+from app.config.settings import OSRM_LOCAL_CONCURRENCY, OSRM_LOCAL_MAX_TABLE_SIZE, OSRM_PROBE_TIMEOUT_SECONDS
+from app.utils.exceptions import OSRMTableTooBigError
 
 
 class OSRMClient:
+    MAX_CONCURRENCY = OSRM_LOCAL_CONCURRENCY
+    # Coordinates per table request; lowered when the server rejects a request as too big
+    MAX_TABLE_SIZE = OSRM_LOCAL_MAX_TABLE_SIZE
     BASE_URL = "http://localhost:5000"
 
     @staticmethod
-    def get_matrix(places: List[Place]) -> Tuple[List[List[float]], List[List[float]]]:
-        if not places or len(places) < 2:
-            raise ValueError("Need at least 2 places for matrix request")
+    async def get_table_async(places: List[Place], sources: Optional[List[int]] = None,
+                              destinations: Optional[List[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        float32 distances and durations from ``sources`` to ``destinations``
+        (indices into ``places``, all of them by default), on the shared
+        keep-alive client with at most ``MAX_CONCURRENCY`` requests at a time
+        """
+        url = OSRMClient._table_url(places, sources, destinations)
+        try:
+            return OSRMClient._arrays(await get_json(url, max_concurrency=OSRMClient.MAX_CONCURRENCY))
+        except httpx.HTTPStatusError as e:
+            if table_too_big(e.response.status_code, e.response.text):
+                raise OSRMTableTooBigError(f"Local OSRM rejected a table over {len(places)} coordinates")
+            raise RuntimeError(f"Local OSRM request failed: {e}")
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Local OSRM request failed: {e}")
+
+    @staticmethod
+    async def health_check_async() -> bool:
+        """Whether the server answers at all: any reply below 500, even an error for the dummy point"""
+        try:
+            status = await get_status(f"{OSRMClient.BASE_URL}/nearest/v1/driving/0,0", OSRM_PROBE_TIMEOUT_SECONDS)
+        except httpx.HTTPError:
+            return False
+        return status < 500
 
+    @staticmethod
+    def _table_url(places: List[Place], sources: Optional[List[int]], destinations: Optional[List[int]]) -> str:
         coords = ";".join([f"{p.longitude},{p.latitude}" for p in places])
         url = f"{OSRMClient.BASE_URL}/table/v1/driving/{coords}?annotations=distance,duration"
+        if sources is not None:
+            url += "&sources=" + ";".join(map(str, sources))
+        if destinations is not None:
+            url += "&destinations=" + ";".join(map(str, destinations))
+        return url
 
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data["distances"], data["durations"]
-        except requests.RequestException as e:
-            raise RuntimeError(f"Local OSRM request failed: {e}")
+    @staticmethod
+    def _arrays(data: dict) -> Tuple[np.ndarray, np.ndarray]:
+        # float32 arrays straight away; the decoded JSON rows are dropped here
+        return np.asarray(data["distances"], dtype=np.float32), np.asarray(data["durations"], dtype=np.float32)
@@ -1,24 +1,58 @@
+import asyncio
+import json
+import time
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Union
 from app.schemas.places import Place
-from app.schemas.routes import OptimizedRoute
-from app.services.distance_service import DistanceService
-from app.services.route_service import RouteService
+from app.schemas.routes import BatchOptimizeRequest, CompactRoute, OptimizedRoute
+from app.services.batch_service import BATCH_ALGOS, BatchService
+from app.services.distance_service import DistanceService, leg_cache
+from app.services.route_service import RouteService, ALGOS, route_cache, solver_pool
 from app.utils.session import get_session
 from app.config.logging import logger
+from app.utils.exceptions import OSRMUnavailableError, SolverBusyError, SolverUnavailableError
+from app.config.settings import EXACT_SOLVER_MAX_STOPS, TARGET_GAP_PERCENT
 
 router = APIRouter(prefix="/route", tags=["Route"])
 
-@router.post("/optimize", response_model=OptimizedRoute)
-def optimize_route(
+@router.post("/optimize", response_model=Union[OptimizedRoute, CompactRoute])
+async def optimize_route(
     session_id: str = Query(...),
-    algo: str = Query("nn2opt"),
-    return_to_start: bool = Query(True)
+    algo: Optional[str] = Query(None),
+    return_to_start: bool = Query(True),
+    workers: int = Query(1, ge=1, le=64),
+    time_limit_ms: Optional[int] = Query(None, ge=1),
+    incremental: bool = Query(True),
+    bound: bool = Query(False),
+    target_gap_percent: Optional[float] = Query(None, ge=0),
+    format: str = Query("full", pattern="^(full|compact)$"),
+    costs: str = Query("road", pattern="^(road|estimate|presolve)$")
 ):
     """
     Optimize route for the user's confirmed places in session.
     Uses start and end points if available.
+    algo: auto | nn | nn2opt | ls (2-opt + Or-opt + 3-opt local search) | lk (iterated Lin-Kernighan) | ga | sa (simulated annealing) | exact
+    auto picks a solver from the number of stops, fixed start/end and time_limit_ms.
+    cluster splits large routes along a space-filling curve and solves the pieces in parallel.
+    portfolio races all solvers in parallel processes until time_limit_ms and returns the best (see winner).
+    Without algo, routes up to EXACT_SOLVER_MAX_STOPS points are solved exactly (Held-Karp), longer ones with nn2opt.
+    An explicit algo always runs as asked (see algo_used).
+    workers: with algo=ga or cluster, number of parallel processes (GA islands / clusters)
+    time_limit_ms: wall-clock budget for the solver; it returns its best route so far
+    incremental: if only a few places changed since the last optimization, repair that route
+    bound: also return a lower bound on the route length and the gap to it
+    target_gap_percent: stop solving once within this percent of the lower bound (implies bound)
+    format: full (a step with both places per leg) | compact (places once, order and legs as arrays)
+    costs: road (OSRM) | estimate (straight-line distances scaled by factors calibrated from OSRM, no OSRM call)
+    | presolve (solve on estimates while the road matrix is fetched, then refine that route on road costs).
+    Without any OSRM backend, road and presolve fall back to estimates; estimated tells which was used.
+    Solving runs in a bounded process pool: 429 when it is full (retry later), 503 if it is down.
     """
+    if algo is not None and algo not in ALGOS:
+        raise HTTPException(status_code=400, detail=f"Unknown algo '{algo}', expected one of: {', '.join(ALGOS)}")
+
     try:
         session_id, state = get_session(session_id)
         route = state.get("route", {})
@@ -36,38 +70,132 @@ def optimize_route(
         logger.info(f"Start: {start.name if start else 'None'}, End: {end.name if end else 'None'}, Return to start: {return_to_start}")
 
         # Get distance matrix for all points (start + regular places + end)
-        all_points = []
-        if start:
-            all_points.append(start)
-        all_points.extend(places_to_optimize)
-        if end and end != start:
-            all_points.append(end)
-
-        distances, durations = DistanceService.get_matrix(all_points, session_id=session_id)
-
-        # Calculate indices for optimization
-        start_idx = 0 if start else None
-        end_idx = len(all_points) - 1 if end and end != start else None
-        
-        # If return_to_start is True, we need to end at the start point
-        if return_to_start and start:
-            end_idx = 0  # End at start point
-
-        optimized = RouteService.optimize(
-            places=all_points,
-            distances=distances,
-            durations=durations,
-            algo=algo,
-            return_to_start=return_to_start,
-            start_index=start_idx,
-            end_index=end_idx
-        )
-
-        logger.info(f"[Session: {session_id}] Optimized route with {len(optimized.optimized_places)} places using {algo}")
+        all_points, start_idx, end_idx = RouteService.route_points(places_to_optimize, start, end, return_to_start)
+
+        # Previous visiting order (place ids) if it was solved under the same constraints and algo
+        signature = (start.id if start else None, end.id if end else None, return_to_start, algo)
+        last = route.get("last_optimized")
+        warm_start = None
+        if incremental and last and last["signature"] == signature:
+            index_of = {p.id: i for i, p in enumerate(all_points)}
+            warm_start = [index_of.get(place_id) for place_id in last["order"]]
+
+        # Cache lookup and waiting for the solver pool block, so keep them off the event loop
+        async def solve(distances, durations, **kwargs):
+            return await run_in_threadpool(
+                RouteService.optimize,
+                places=all_points,
+                distances=distances,
+                durations=durations,
+                algo=algo,
+                return_to_start=return_to_start,
+                start_index=start_idx,
+                end_index=end_idx,
+                workers=workers,
+                time_limit_ms=time_limit_ms,
+                warm_start=warm_start,
+                bound=bound,
+                target_gap_percent=target_gap_percent if target_gap_percent is not None else TARGET_GAP_PERCENT,
+                offload=True,
+                **kwargs
+            )
+
+        matrix_started = time.monotonic()
+        seed, presolve_ms = None, None
+        if costs == "estimate":
+            distances, durations = DistanceService.estimate_matrix(all_points)
+            estimated = True
+        else:
+            fetch = asyncio.ensure_future(
+                DistanceService.get_matrix_or_estimate_async(all_points, session_id=session_id))
+            if costs == "presolve" and len(all_points) > EXACT_SOLVER_MAX_STOPS:
+                # The solve on estimates overlaps the road matrix fetch; small routes are not worth it
+                try:
+                    presolved = await solve(*DistanceService.estimate_matrix(all_points), compact=True,
+                                            use_cache=False)
+                except BaseException:
+                    fetch.cancel()
+                    raise
+                seed = presolved.visiting_order
+                presolve_ms = (time.monotonic() - matrix_started) * 1000
+            distances, durations, estimated = await fetch
+        matrix_ms = (time.monotonic() - matrix_started) * 1000
+
+        optimized = await solve(distances, durations, compact=format == "compact", seed=seed)
+        optimized.estimated = estimated
+        route["last_optimized"] = {
+            "signature": signature,
+            "order": [all_points[i].id for i in optimized.visiting_order],
+        }
+
+        if optimized.timings_ms is not None:
+            optimized.timings_ms["matrix"] = round(matrix_ms, 3)
+            if presolve_ms is not None:
+                optimized.timings_ms["presolve"] = round(presolve_ms, 3)
+
+        logger.info(f"[Session: {session_id}] Optimized route with {len(optimized.visiting_order)} places "
+                    f"using {optimized.algo_used or algo} (timings: {optimized.timings_ms})")
         return optimized
 
     except HTTPException:
         raise
+    except SolverBusyError as e:
+        logger.warning(f"[Session: {session_id}] Rejected optimization: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except (SolverUnavailableError, OSRMUnavailableError) as e:
+        logger.error(f"[Session: {session_id}] {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"[Session: {session_id}] Failed to optimize route: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to optimize route: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to optimize route: {str(e)}")
+
+
+@router.post("/optimize-batch")
+async def optimize_batch(
+    request: BatchOptimizeRequest,
+    format: str = Query("full", pattern="^(full|compact)$")
+):
+    """
+    Optimize many independent routes (e.g. one per driver) in one request.
+    Each route carries its own places, start, end, return_to_start, algo and time_limit_ms;
+    algo=portfolio is not available here.
+    Results stream back as NDJSON, one line per route as soon as it is solved (not in request order):
+    {"index": i, "id": ..., "route": {...}} or {"index": i, "id": ..., "error": "..."}
+    """
+    for i, item in enumerate(request.routes):
+        if item.algo is not None and item.algo not in BATCH_ALGOS:
+            raise HTTPException(status_code=400, detail=f"Route {i}: algo '{item.algo}' is not available in a batch, "
+                                                        f"expected one of: {', '.join(BATCH_ALGOS)}")
+
+    logger.info(f"Optimizing a batch of {len(request.routes)} routes")
+    results = BatchService.optimize(request.routes, compact=format == "compact")
+    return StreamingResponse(_ndjson(results), media_type="application/x-ndjson")
+
+
+async def _ndjson(results: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for result in results:
+        yield json.dumps(result) + "\n"
+
+
+@router.get("/cache/stats")
+def route_cache_stats():
+    """Hit/miss counters and occupancy of the optimized route cache."""
+    return route_cache.stats()
+
+
+@router.get("/cache/legs/stats")
+def leg_cache_stats():
+    """Hit/miss counters (per matrix cell) and occupancy of the OSRM leg cache."""
+    return leg_cache.stats()
+
+
+@router.get("/solver/stats")
+def solver_pool_stats():
+    """Running / queued optimizations and rejection counters of the solver pool."""
+    return solver_pool.stats()
+
+
+@router.get("/osrm/status")
+def osrm_backend_status():
+    """Circuit breaker state of the local and public OSRM backends, and failover counters."""
+    return DistanceService.backend_stats()
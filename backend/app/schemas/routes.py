@@ -1,7 +1,8 @@
 # app/schemas/routes.py
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from app.schemas.places import Place
+from app.config.settings import BATCH_MAX_ROUTES
 
 
 class RouteStep(BaseModel):
@@ -19,6 +20,15 @@ class OptimizedRoute(BaseModel):
     steps: List[RouteStep]
     total_distance: int   # meters
     total_time: int       # seconds
+    iterations: Optional[int] = None    # solver work units (moves, kicks, generations...)
+    converged: Optional[bool] = None    # False if the time limit cut the solver short
+    algo_used: Optional[str] = None     # solver that actually ran (after auto / exact selection)
+    winner: Optional[str] = None        # with algo=portfolio, the solver whose route was returned
+    lower_bound: Optional[float] = None     # meters no route can beat (Held-Karp bound)
+    gap_percent: Optional[float] = None     # total_distance above lower_bound, in percent
+    timings_ms: Optional[Dict[str, float]] = None   # matrix / bound / solve / build phases
+    cached: Optional[bool] = None       # True if served from the route cache
+    estimated: Optional[bool] = None    # True if solved on straight-line estimates, not OSRM road costs
 
     class Config:
         json_schema_extra = {
@@ -40,3 +50,73 @@ class OptimizedRoute(BaseModel):
                 "total_time": 300
             }
         }
+
+
+class CompactRoute(BaseModel):
+    """
+    Index-based form of OptimizedRoute (format=compact): every place once, in
+    request order, with the route and its legs as parallel arrays.
+    """
+    places: List[Place]
+    visiting_order: List[int]           # indices into places
+    leg_distances: List[int]            # meters, leg i goes visiting_order[i] -> visiting_order[i + 1]
+    leg_durations: List[int]            # seconds, same legs
+    total_distance: int   # meters
+    total_time: int       # seconds
+    iterations: Optional[int] = None
+    converged: Optional[bool] = None
+    algo_used: Optional[str] = None
+    winner: Optional[str] = None
+    lower_bound: Optional[float] = None
+    gap_percent: Optional[float] = None
+    timings_ms: Optional[Dict[str, float]] = None
+    cached: Optional[bool] = None
+    estimated: Optional[bool] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "places": [
+                    {"name": "Place A", "latitude": 18.52, "longitude": 73.85},
+                    {"name": "Place B", "latitude": 18.53, "longitude": 73.84},
+                ],
+                "visiting_order": [0, 1],
+                "leg_distances": [1200],
+                "leg_durations": [300],
+                "total_distance": 1200,
+                "total_time": 300
+            }
+        }
+
+
+class RouteRequest(BaseModel):
+    """One route of a batch: its places and constraints, as a session would hold them."""
+    id: Optional[str] = None            # echoed back with the result
+    places: List[Place]
+    start: Optional[Place] = None
+    end: Optional[Place] = None
+    return_to_start: bool = True
+    algo: Optional[str] = None          # unset: exact for small routes, else nn2opt
+    time_limit_ms: Optional[int] = Field(None, ge=1)
+
+
+class BatchOptimizeRequest(BaseModel):
+    """Independent routes optimized by /route/optimize-batch."""
+    routes: List[RouteRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ROUTES)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "routes": [
+                    {
+                        "id": "driver-1",
+                        "start": {"name": "Depot", "latitude": 18.50, "longitude": 73.80},
+                        "places": [
+                            {"name": "Place A", "latitude": 18.52, "longitude": 73.85},
+                            {"name": "Place B", "latitude": 18.53, "longitude": 73.84},
+                        ],
+                        "return_to_start": True
+                    }
+                ]
+            }
+        }
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple, Union
+from app.schemas.places import Place
+from app.schemas.routes import CompactRoute, OptimizedRoute, RouteRequest
+from app.services.distance_service import DistanceService
+from app.services.route_service import ALGOS, RouteService, solver_pool
+from app.modules.optimization.matrix import CostMatrix
+from app.config.settings import MATRIX_FETCH_CONCURRENCY
+from app.config.logging import logger
+from app.utils.exceptions import SolverBusyError
+
+# Each route runs in a single pool worker, so modes that need the pool themselves are left out
+BATCH_ALGOS = [algo for algo in ALGOS if algo != "portfolio"]
+
+# Seconds between attempts to hand a route to a full solver pool
+_BUSY_RETRY_SECONDS = 0.05
+
+
+class BatchService:
+    """
+    Optimizes many independent routes per request.
+
+    Matrices are fetched concurrently on the async OSRM client
+    (``MATRIX_FETCH_CONCURRENCY`` routes at a time), estimated if no OSRM
+    backend is available, and each route is handed to ``solver_pool`` as soon
+    as its matrix arrives, so fetching and solving overlap. A batch keeps at
+    most the pool's worker count of routes in it, leaving its queue to
+    interactive requests, and waits while the pool is full. Results are
+    yielded as routes finish, not in request order.
+    """
+
+    @staticmethod
+    async def optimize(routes: List[RouteRequest], compact: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield ``{"index", "id", "route"}`` per solved route, or
+        ``{"index", "id", "error"}`` if its matrix or solve failed
+        """
+        fetch_limit = asyncio.Semaphore(MATRIX_FETCH_CONCURRENCY)
+        # future -> (stage, route index); the stages are "matrix" then "solve"
+        pending: Dict[asyncio.Future, Tuple[str, int]] = {}
+        points: Dict[int, Tuple[List[Place], Optional[int], Optional[int]]] = {}
+        matrices: Dict[int, Tuple[Optional[CostMatrix], Optional[CostMatrix]]] = {}
+        matrix_ms: Dict[int, float] = {}
+        estimated: Dict[int, bool] = {}
+        # Routes whose matrix arrived, waiting for room in the solver pool
+        ready: Deque[int] = deque()
+        solving = 0
+
+        try:
+            for i, item in enumerate(routes):
+                points[i] = RouteService.route_points(item.places, item.start, item.end, item.return_to_start)
+                pending[asyncio.ensure_future(_fetch_matrix(points[i][0], fetch_limit))] = ("matrix", i)
+
+            while pending or ready:
+                while ready and solving < solver_pool.max_workers:
+                    i = ready[0]
+                    item = routes[i]
+                    route_points, start_idx, end_idx = points[i]
+                    try:
+                        solve = solver_pool.submit(_solve_route, route_points, *matrices[i], item.algo,
+                                                   item.return_to_start, start_idx, end_idx, item.time_limit_ms,
+                                                   compact)
+                    except SolverBusyError:
+                        break
+                    except Exception as e:
+                        ready.popleft()
+                        logger.warning(f"Batch route {i} ({item.id}) failed: {e}")
+                        yield {"index": i, "id": item.id, "error": str(e)}
+                        continue
+                    ready.popleft()
+                    del points[i], matrices[i]
+                    solving += 1
+                    pending[asyncio.wrap_future(solve)] = ("solve", i)
+
+                if not pending:
+                    # The pool is full with other requests' work
+                    await asyncio.sleep(_BUSY_RETRY_SECONDS)
+                    continue
+                done, _ = await asyncio.wait(pending, timeout=_BUSY_RETRY_SECONDS if ready else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    stage, i = pending.pop(future)
+                    item = routes[i]
+                    try:
+                        if stage == "matrix":
+                            distances, durations, estimated[i], matrix_ms[i] = future.result()
+                            matrices[i] = (distances, durations)
+                            ready.append(i)
+                            continue
+
+                        solving -= 1
+                        optimized = future.result()
+                        optimized.estimated = estimated.pop(i)
+                        if optimized.timings_ms is not None:
+                            optimized.timings_ms["matrix"] = round(matrix_ms.pop(i), 3)
+                        yield {"index": i, "id": item.id, "route": optimized.model_dump(mode="json")}
+                    except Exception as e:
+                        logger.warning(f"Batch route {i} ({item.id}) failed: {e}")
+                        yield {"index": i, "id": item.id, "error": str(e)}
+        finally:
+            # Also reached when the client goes away mid-stream
+            for future in pending:
+                future.cancel()
+
+
+async def _fetch_matrix(points: List[Place],
+                        limit: asyncio.Semaphore) -> Tuple[Optional[CostMatrix], Optional[CostMatrix], bool, float]:
+    """
+    Distance and duration matrices for one route, whether they are estimated,
+    and the time taken; none are needed below 2 points
+    """
+    if len(points) < 2:
+        return None, None, False, 0.0
+    async with limit:
+        started = time.monotonic()
+        distances, durations, estimated = await DistanceService.get_matrix_or_estimate_async(points)
+        return distances, durations, estimated, (time.monotonic() - started) * 1000
+
+
+def _solve_route(points: List[Place], distances: Optional[CostMatrix], durations: Optional[CostMatrix],
+                 algo: Optional[str], return_to_start: bool, start_idx: Optional[int], end_idx: Optional[int],
+                 time_limit_ms: Optional[int], compact: bool) -> Union[OptimizedRoute, CompactRoute]:
+    """Worker entry point: optimize one route of a batch"""
+    # The route cache lives in the API process, a worker's copy would never be hit again
+    return RouteService.optimize(
+        places=points,
+        distances=distances,
+        durations=durations,
+        algo=algo,
+        return_to_start=return_to_start,
+        start_index=start_idx,
+        end_index=end_idx,
+        time_limit_ms=time_limit_ms,
+        use_cache=False,
+        compact=compact
+    )
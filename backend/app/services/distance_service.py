@@ -1,8 +1,40 @@
-from typing import List, Tuple
+import asyncio
+from typing import List, Optional, Tuple, Type, Union
+import numpy as np
 from app.schemas.places import Place
 from app.modules.routing.osrm_client import OSRMClient
 from app.modules.routing.osrm_public_client import OSRMExternalClient
+from app.modules.optimization.matrix import CostMatrix
+from app.modules.routing.estimate import RoadEstimator
+from app.services.leg_cache import LegCache, PointKey
+from app.config.settings import (
+    ESTIMATE_DETOUR_FACTOR, ESTIMATE_MIN_LEG_METERS, ESTIMATE_MIN_SAMPLES, ESTIMATE_SPEED_KMH,
+    LEG_CACHE_SIZE, OSRM_BREAKER_FAILURES, OSRM_BREAKER_RESET_SECONDS, OSRM_ESTIMATE_FALLBACK
+)
 from app.config.logging import logger
+from app.utils.exceptions import OSRMTableTooBigError, OSRMUnavailableError
+from app.utils.circuit_breaker import CircuitBreaker
+
+# Legs already fetched, shared by all sessions
+leg_cache = LegCache(maxsize=LEG_CACHE_SIZE)
+
+# Straight-line estimates, calibrated from every block fetched from OSRM
+road_estimator = RoadEstimator(ESTIMATE_DETOUR_FACTOR, ESTIMATE_SPEED_KMH / 3.6,
+                               ESTIMATE_MIN_LEG_METERS, ESTIMATE_MIN_SAMPLES)
+
+# (rows, columns) of the matrix covered by one fetch
+Block = Tuple[np.ndarray, np.ndarray]
+
+OSRMTableClient = Union[Type[OSRMClient], Type[OSRMExternalClient]]
+
+# Backends in order of preference, each behind its own circuit breaker
+BACKENDS: List[Tuple[str, OSRMTableClient, CircuitBreaker]] = [
+    ("local", OSRMClient, CircuitBreaker("local", OSRM_BREAKER_FAILURES, OSRM_BREAKER_RESET_SECONDS)),
+    ("public", OSRMExternalClient, CircuitBreaker("public", OSRM_BREAKER_FAILURES, OSRM_BREAKER_RESET_SECONDS)),
+]
+
+# Blocks served by a fallback backend, by why the preferred one was passed over
+failovers = {"skipped": 0, "failed": 0}
 
 
 class DistanceService:
@@ -10,26 +42,241 @@ class DistanceService:
     Provides distance/duration matrices from either:
     - Local Docker OSRM
     - Public API fallback
+
+    as compact ``CostMatrix`` objects (float32, upper triangle when symmetric).
+    Legs are cached per pair of points, so only the rows and columns of points
+    not seen before are requested, in tiles small enough for each server's
+    table size limit, in parallel on the shared async HTTP client; the tiles
+    are written straight into the preallocated matrices.
+
+    A backend whose circuit breaker is open is skipped without waiting for
+    its timeout; ``probe_backends`` checks skipped backends in the background
+    so they come back as soon as they answer again. When no backend is left,
+    ``get_matrix_or_estimate_async`` falls back to ``estimate_matrix``:
+    great-circle distances scaled by detour and speed factors learned from
+    the legs OSRM returned before.
     """
 
     @staticmethod
-    def get_matrix(places: List[Place], session_id: str = None) -> Tuple[List[List[float]], List[List[float]]]:
+    async def get_matrix_async(places: List[Place], session_id: str = None) -> Tuple[CostMatrix, CostMatrix]:
+        # Cache lookups and matrix assembly are O(n^2), so they run off the event loop
+        keys, distances, durations, missing = await asyncio.to_thread(DistanceService._lookup, places)
+        blocks = DistanceService._missing_blocks(missing)
+        await asyncio.gather(*(
+            DistanceService._fetch_block_async(places, keys, rows, cols, distances, durations, session_id)
+            for rows, cols in blocks
+        ))
+        return await asyncio.to_thread(DistanceService._finish, places, distances, durations, missing, blocks,
+                                       session_id)
+
+    @staticmethod
+    async def get_matrix_or_estimate_async(places: List[Place],
+                                           session_id: str = None) -> Tuple[CostMatrix, CostMatrix, bool]:
+        """
+        ``get_matrix_async``, or estimated matrices if no OSRM backend is
+        available (unless OSRM_ESTIMATE_FALLBACK is off); the flag tells which
+        """
+        try:
+            distances, durations = await DistanceService.get_matrix_async(places, session_id=session_id)
+            return distances, durations, False
+        except OSRMUnavailableError as e:
+            if not OSRM_ESTIMATE_FALLBACK:
+                raise
+            logger.warning(f"[Session: {session_id}] {e}, using estimated costs for {len(places)} places")
+        distances, durations = DistanceService.estimate_matrix(places)
+        return distances, durations, True
+
+    @staticmethod
+    def estimate_matrix(places: List[Place]) -> Tuple[CostMatrix, CostMatrix]:
+        """Straight-line distance and duration estimates; never cached as legs"""
         if not places or len(places) < 2:
             raise ValueError("Need at least 2 places for distance matrix")
+        return road_estimator.estimate(places)
 
-        try:
-            # Try local docker OSRM
-            distances, durations = OSRMClient.get_matrix(places)
-            logger.info(f"[Session: {session_id}] Distance matrix computed via local OSRM for {len(places)} places")
-        except Exception as e:
-            logger.warning(f"[Session: {session_id}] Local OSRM failed: {e}. Falling back to external API.")
-            distances, durations = OSRMExternalClient.get_matrix(places)
-
-        # Validate matrix dimensions
-        n = len(places)
-        if len(distances) != n or any(len(row) != n for row in distances):
+    @staticmethod
+    def _lookup(places: List[Place]) -> Tuple[List[PointKey], np.ndarray, np.ndarray, np.ndarray]:
+        if not places or len(places) < 2:
+            raise ValueError("Need at least 2 places for distance matrix")
+        keys = [LegCache.point_key(p) for p in places]
+        return (keys, *leg_cache.lookup(keys))
+
+    @staticmethod
+    def _missing_blocks(missing: np.ndarray) -> List[Block]:
+        """
+        Blocks covering the ``missing`` cells: the rows of the new
+        points, then their columns from the other points. Past half of the
+        points one full table is cheaper.
+        """
+        if not missing.any():
+            return []
+        n = missing.shape[0]
+        # Points never seen (not even their zero self-leg is cached), plus the
+        # rows of legs evicted between points that were
+        new = missing.diagonal().copy()
+        new |= (missing & ~new[:, None] & ~new[None, :]).any(axis=1)
+        fresh = np.flatnonzero(new)
+        if 2 * len(fresh) >= n:
+            return [(np.arange(n), np.arange(n))]
+        return [(fresh, np.arange(n)), (np.setdiff1d(np.arange(n), fresh), fresh)]
+
+    @staticmethod
+    def _fill(keys: List[PointKey], distances: np.ndarray, durations: np.ndarray, rows: np.ndarray,
+              cols: np.ndarray, block_d: np.ndarray, block_t: np.ndarray) -> None:
+        """Write one fetched block into the matrices and the leg cache"""
+        if block_d.shape != (len(rows), len(cols)):
             raise ValueError("Distance matrix shape mismatch")
-        if len(durations) != n or any(len(row) != n for row in durations):
+        if block_t.shape != (len(rows), len(cols)):
             raise ValueError("Duration matrix shape mismatch")
 
-        return distances, durations
+        distances[np.ix_(rows, cols)] = block_d
+        durations[np.ix_(rows, cols)] = block_t
+        leg_cache.store([keys[i] for i in rows], [keys[j] for j in cols], block_d, block_t)
+        coords = np.asarray(keys, dtype=float)
+        road_estimator.observe(coords[rows], coords[cols], block_d, block_t)
+
+    @staticmethod
+    def _fill_tiles(keys: List[PointKey], distances: np.ndarray, durations: np.ndarray,
+                    tiles: List[Tuple[Block, Tuple[np.ndarray, np.ndarray]]]) -> None:
+        for tile, tables in tiles:
+            DistanceService._fill(keys, distances, durations, *tile, *tables)
+
+    @staticmethod
+    def _finish(places: List[Place], distances: np.ndarray, durations: np.ndarray, missing: np.ndarray,
+                blocks: List[Block], session_id: Optional[str]) -> Tuple[CostMatrix, CostMatrix]:
+        n = len(places)
+        if blocks:
+            logger.info(f"[Session: {session_id}] Fetched {int(missing.sum())} of {n * n} legs "
+                        f"in {len(blocks)} block(s)")
+        else:
+            logger.info(f"[Session: {session_id}] Distance matrix for {n} places served from leg cache")
+        return CostMatrix.from_rows(distances), CostMatrix.from_rows(durations)
+
+    @staticmethod
+    async def _fetch_block_async(places: List[Place], keys: List[PointKey], rows: np.ndarray, cols: np.ndarray,
+                                 distances: np.ndarray, durations: np.ndarray, session_id: Optional[str]) -> None:
+        """Fetch one block from the first backend whose breaker lets it through and that succeeds"""
+        reason = None
+        for name, client, breaker in BACKENDS:
+            if not breaker.allow_request():
+                reason = reason or "skipped"
+                continue
+            try:
+                await DistanceService._fetch_tiles_async(client, places, keys, rows, cols, distances, durations)
+            except Exception as e:
+                breaker.record_failure(e)
+                logger.warning(f"[Session: {session_id}] {name} OSRM failed: {e}")
+                reason = reason or "failed"
+                continue
+            breaker.record_success()
+            DistanceService._count_failover(reason, name, session_id)
+            return
+        raise OSRMUnavailableError("No OSRM backend available")
+
+    @staticmethod
+    def _count_failover(reason: Optional[str], name: str, session_id: Optional[str]) -> None:
+        if reason is not None:
+            failovers[reason] += 1
+            logger.info(f"[Session: {session_id}] Served by {name} OSRM ({reason} preferred backend)")
+
+    @staticmethod
+    async def probe_backends() -> None:
+        """
+        Health-probe every backend whose breaker is due for a trial; the
+        answer closes or re-opens it without risking a user request
+        """
+        for name, client, breaker in BACKENDS:
+            if not breaker.claim_probe():
+                continue
+            if await client.health_check_async():
+                breaker.record_success()
+                logger.info(f"{name} OSRM is reachable again")
+            else:
+                breaker.record_failure(RuntimeError("health probe failed"))
+
+    @staticmethod
+    async def run_health_probes(interval: float) -> None:
+        """Probe the backends every ``interval`` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await DistanceService.probe_backends()
+            except Exception as e:
+                logger.warning(f"OSRM health probe failed: {e}")
+
+    @staticmethod
+    def backend_stats() -> dict:
+        """
+        Breaker state and counters per backend, how often a fallback served a
+        block, and the factors of the estimate fallback
+        """
+        return {
+            "backends": {name: breaker.stats() for name, _, breaker in BACKENDS},
+            "failovers": dict(failovers),
+            "estimate": road_estimator.stats(),
+        }
+
+    @staticmethod
+    async def _fetch_tiles_async(client: OSRMTableClient, places: List[Place], keys: List[PointKey],
+                                 rows: np.ndarray, cols: np.ndarray, distances: np.ndarray,
+                                 durations: np.ndarray) -> None:
+        """
+        Fetch ``rows`` x ``cols`` from ``client`` with all tiles requested at
+        once (the client's per-host cap bounds how many are in flight),
+        halving the tiles it rejects as too big
+        """
+        pending = [(rows, cols)]
+        while pending:
+            size = client.MAX_TABLE_SIZE
+            tiles = [t for r, c in pending for t in DistanceService._tiles(r, c, size)]
+            requests = await asyncio.to_thread(DistanceService._tile_requests, places, tiles)
+            results = await asyncio.gather(*(client.get_table_async(*request) for request in requests),
+                                           return_exceptions=True)
+
+            pending = [tile for tile, result in zip(tiles, results) if isinstance(result, OSRMTableTooBigError)]
+            # One thread fills every tile: a thread per tile would starve the event loop of the GIL
+            await asyncio.to_thread(DistanceService._fill_tiles, keys, distances, durations, [
+                (tile, result) for tile, result in zip(tiles, results) if not isinstance(result, BaseException)
+            ])
+            for result in results:
+                if isinstance(result, BaseException) and not isinstance(result, OSRMTableTooBigError):
+                    raise result
+            if pending:
+                DistanceService._shrink(client, size)
+
+    @staticmethod
+    def _tiles(rows: np.ndarray, cols: np.ndarray, size: int) -> List[Block]:
+        """Split ``rows`` x ``cols`` into blocks of at most ``size`` distinct points each"""
+        if len(np.union1d(rows, cols)) <= size:
+            return [(rows, cols)]
+        if len(cols) <= size // 2:
+            # Few columns (e.g. a handful of new points): keep them whole
+            row_step, col_step = size - len(cols), len(cols)
+        elif len(rows) <= size // 2:
+            row_step, col_step = len(rows), size - len(rows)
+        else:
+            row_step = col_step = size // 2
+        return [(rows[i:i + row_step], cols[j:j + col_step])
+                for i in range(0, len(rows), row_step) for j in range(0, len(cols), col_step)]
+
+    @staticmethod
+    def _tile_request(places: List[Place], rows: np.ndarray,
+                      cols: np.ndarray) -> Tuple[List[Place], Optional[List[int]], Optional[List[int]]]:
+        """Arguments of ``get_table`` for one tile: only its own points go into the URL"""
+        points = np.union1d(rows, cols)
+        subset = [places[i] for i in points]
+        if len(rows) == len(cols) == len(points):
+            return subset, None, None
+        return subset, np.searchsorted(points, rows).tolist(), np.searchsorted(points, cols).tolist()
+
+    @staticmethod
+    def _tile_requests(places: List[Place], tiles: List[Block]) -> List[Tuple[List[Place], Optional[List[int]],
+                                                                          Optional[List[int]]]]:
+        return [DistanceService._tile_request(places, *tile) for tile in tiles]
+
+    @staticmethod
+    def _shrink(client: OSRMTableClient, size: int) -> None:
+        """Halve the tile size of ``client`` after it rejected a ``size`` point request"""
+        if size <= 2:
+            raise OSRMTableTooBigError(f"{client.__name__} rejects even {size}-point tables")
+        client.MAX_TABLE_SIZE = min(client.MAX_TABLE_SIZE, size // 2)
+        logger.warning(f"{client.__name__} rejected {size}-point tables, tiling at {client.MAX_TABLE_SIZE} points")
@@ -0,0 +1,120 @@
+import threading
+from typing import Dict, List, Tuple
+import numpy as np
+from cachetools import LRUCache
+from app.schemas.places import Place
+
+# Coordinates are matched after rounding to this many decimals (about 1 m)
+COORD_DECIMALS = 5
+
+PointKey = Tuple[float, float]
+
+# Rounded coordinates packed into one int64 per point: latitude and longitude in
+# units of 10^-COORD_DECIMALS degrees, each shifted to be non-negative
+_SCALE = 10 ** COORD_DECIMALS
+_LON_SPAN = 360 * _SCALE + 1
+
+# One cached row: sorted destination codes and their (distance, duration) legs
+Row = Tuple[np.ndarray, np.ndarray]
+
+
+class LegCache:
+    """
+    LRU cache of single legs (distance, duration) between points.
+
+    Points are keyed by their rounded coordinates, so the same location is
+    shared by every session and request. Legs are kept per source point as a
+    row of sorted destination codes, so looking up or storing a matrix takes
+    one vectorized search per row. At most ``maxsize`` legs are kept; the rows
+    of the least recently used source points are evicted first. Hit/miss
+    counters count cells.
+    """
+
+    def __init__(self, maxsize: int):
+        self._cache: LRUCache = LRUCache(maxsize=maxsize, getsizeof=lambda row: len(row[0]))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def point_key(place: Place) -> PointKey:
+        return round(place.latitude, COORD_DECIMALS), round(place.longitude, COORD_DECIMALS)
+
+    @staticmethod
+    def codes(keys: List[PointKey]) -> np.ndarray:
+        """int64 code of every point key"""
+        coords = np.rint(np.asarray(keys, dtype=float).reshape(-1, 2) * _SCALE).astype(np.int64)
+        return (coords[:, 0] + 90 * _SCALE) * _LON_SPAN + (coords[:, 1] + 180 * _SCALE)
+
+    def lookup(self, keys: List[PointKey]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        float32 distance and duration matrices over ``keys`` with what is
+        cached, plus a boolean mask of the cells that are not
+        """
+        n = len(keys)
+        codes = self.codes(keys)
+        distances = np.full((n, n), np.nan, dtype=np.float32)
+        durations = np.full((n, n), np.nan, dtype=np.float32)
+        missing = np.ones((n, n), dtype=bool)
+
+        with self._lock:
+            rows = [self._cache.get(code) for code in codes.tolist()]
+
+        # Rows are replaced, never modified, so they can be read outside the lock
+        for i, row in enumerate(rows):
+            if row is None:
+                continue
+            row_codes, row_legs = row
+            pos = np.minimum(np.searchsorted(row_codes, codes), len(row_codes) - 1)
+            found = row_codes[pos] == codes
+            distances[i, found] = row_legs[pos[found], 0]
+            durations[i, found] = row_legs[pos[found], 1]
+            missing[i, found] = False
+
+        hits = n * n - int(missing.sum())
+        with self._lock:
+            self.hits += hits
+            self.misses += n * n - hits
+        return distances, durations, missing
+
+    def store(self, sources: List[PointKey], destinations: List[PointKey],
+              distances: np.ndarray, durations: np.ndarray) -> None:
+        """Cache a block of legs from ``sources`` (rows) to ``destinations`` (columns); unroutable legs are skipped"""
+        source_codes = self.codes(sources).tolist()
+        destination_codes = self.codes(destinations)
+        legs = np.stack([distances, durations], axis=-1).astype(np.float32)
+        routable = ~np.isnan(legs).any(axis=-1)
+
+        for code, row_legs, ok in zip(source_codes, legs, routable):
+            if not ok.any():
+                continue
+            with self._lock:
+                row = self._merge(self._cache.get(code), destination_codes[ok], row_legs[ok])
+                if len(row[0]) <= self._cache.maxsize:
+                    self._cache[code] = row
+
+    @staticmethod
+    def _merge(row, codes: np.ndarray, legs: np.ndarray) -> Row:
+        """``row`` with the legs to ``codes`` added; new legs replace cached ones"""
+        if row is not None:
+            codes = np.concatenate([codes, row[0]])
+            legs = np.concatenate([legs, row[1]])
+        # np.unique keeps the first occurrence of each code: the new legs come first
+        codes, first = np.unique(codes, return_index=True)
+        return codes, legs[first]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": self._cache.currsize,
+                "points": len(self._cache),
+                "maxsize": self._cache.maxsize,
+            }
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from typing import Dict, List, Optional, Union
+from cachetools import TTLCache
+from app.schemas.places import Place
+from app.schemas.routes import CompactRoute, OptimizedRoute
+from app.modules.optimization.matrix import CostMatrix
+
+
+class RouteCache:
+    """
+    LRU + TTL cache of optimized routes.
+
+    Keys fingerprint everything the result depends on: the matrix bytes, the
+    places (they are echoed back in the response) and the solver parameters.
+    Hit/miss counters are kept for sizing.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(places: List[Place], dist_mx: CostMatrix, dur_mx: CostMatrix, **params) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(CostMatrix.of(dist_mx).tobytes())
+        digest.update(CostMatrix.of(dur_mx).tobytes())
+        for place in places:
+            digest.update(f"{place.name}|{place.latitude}|{place.longitude}\n".encode())
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Union[OptimizedRoute, CompactRoute]]:
+        with self._lock:
+            route = self._cache.get(key)
+            if route is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Callers may annotate the response, so never hand out the cached instance
+        return route.model_copy(deep=True)
+
+    def put(self, key: str, route: Union[OptimizedRoute, CompactRoute]) -> None:
+        with self._lock:
+            self._cache[key] = route.model_copy(deep=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+            }
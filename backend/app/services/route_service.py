@@ -1,26 +1,90 @@
-from typing import List, Tuple
+import time
+from typing import List, Optional, Tuple, Union
 import numpy as np
 from app.schemas.places import Place
-from app.schemas.routes import OptimizedRoute, RouteStep
+from app.schemas.routes import CompactRoute, OptimizedRoute, RouteStep
+from app.config.settings import (EXACT_SOLVER_MAX_STOPS, ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL_SECONDS, SOLVER_POOL_WORKERS,
+                                 SOLVER_QUEUE_SIZE, TARGET_GAP_PERCENT)
+from app.services.route_cache import RouteCache
+from app.services.solver_pool import SolverPool
 from app.modules.optimization.nn import nearest_neighbor
 from app.modules.optimization.two_opt import two_opt_optimize
-from app.modules.optimization.genetic import genetic_tsp
+from app.modules.optimization.genetic import genetic_tsp, island_genetic_tsp
+from app.modules.optimization.local_search import local_search, local_search_optimize
+from app.modules.optimization.lk import lin_kernighan
+from app.modules.optimization.held_karp import MAX_FREE_STOPS, free_stop_count, held_karp
+from app.modules.optimization.sa import simulated_annealing
+from app.modules.optimization.budget import SolveBudget
+from app.modules.optimization.selector import select_algo
+from app.modules.optimization.incremental import reoptimize
+from app.modules.optimization.cluster import cluster_solve
+from app.modules.optimization.portfolio import portfolio_solve
+from app.modules.optimization.bounds import lower_bound
+from app.modules.optimization.problem import ClosedTourProblem
+from app.modules.optimization.matrix import CostMatrix
+from app.modules.optimization.parallel import configure_pool
+
+# Solvers by algo name; each takes (dist_mx, start, end, return_to_start, budget=...)
+SOLVERS = {
+    "nn": nearest_neighbor,
+    "nn2opt": two_opt_optimize,
+    "ls": local_search_optimize,
+    "lk": lin_kernighan,
+    "ga": genetic_tsp,
+    "sa": simulated_annealing,
+    "exact": held_karp,
+}
+
+# Everything /route/optimize accepts: the solvers plus modes built on top of them
+ALGOS = ["auto", *SOLVERS, "cluster", "portfolio"]
+
+# Heuristic used when no algo is given for a route too long to solve exactly
+DEFAULT_ALGO = "nn2opt"
+
+# Routes solved exactly by default; never more than Held-Karp can take
+EXACT_MAX_STOPS = min(EXACT_SOLVER_MAX_STOPS, MAX_FREE_STOPS)
+
+# Results of recent optimizations, shared by all sessions
+route_cache = RouteCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL_SECONDS)
+
+# Processes that run optimizations off the request workers (see ``offload``)
+solver_pool = SolverPool(max_workers=SOLVER_POOL_WORKERS, max_queue=SOLVER_QUEUE_SIZE)
+
+# Fan-outs hold solver_pool slots for their processes, so the shared pool gets no more
+configure_pool(SOLVER_POOL_WORKERS)
 
 
 class RouteService:
     @staticmethod
     def optimize(
         places: List[Place],
-        distances: List[List[float]],
-        durations: List[List[float]],
-        algo: str = "nn2opt",
+        distances: Union[CostMatrix, List[List[float]]],
+        durations: Union[CostMatrix, List[List[float]]],
+        algo: Optional[str] = None,
         return_to_start: bool = True,
         start_index: int = None,
-        end_index: int = None
-    ) -> OptimizedRoute:
+        end_index: int = None,
+        workers: int = 1,
+        time_limit_ms: Optional[int] = None,
+        use_cache: bool = True,
+        warm_start: Optional[List[Optional[int]]] = None,
+        bound: bool = False,
+        target_gap_percent: Optional[float] = TARGET_GAP_PERCENT,
+        compact: bool = False,
+        offload: bool = False,
+        seed: Optional[List[int]] = None
+    ) -> Union[OptimizedRoute, CompactRoute]:
+        """
+        Optimized visiting order for ``places`` (exact up to EXACT_MAX_STOPS
+        without ``algo``), repairing ``warm_start`` or refining ``seed`` when
+        given; ``offload`` solves it in ``solver_pool``
+        """
 
         # Handle trivial cases
         if len(places) <= 1:
+            if compact:
+                return CompactRoute(places=places, visiting_order=list(range(len(places))),
+                                    leg_distances=[], leg_durations=[], total_distance=0, total_time=0)
             return OptimizedRoute(
                 optimized_places=places,
                 visiting_order=list(range(len(places))),
@@ -29,100 +93,239 @@ class RouteService:
                 total_time=0
             )
 
-        dist_mx = np.array(distances, dtype=float)
-        dur_mx = np.array(durations, dtype=float)
-        RouteService._validate_matrix(dist_mx, dur_mx)
-
-        # Select optimization strategy
-        if start_index is not None and end_index is not None:
-            order = RouteService._optimize_with_fixed_points(dist_mx, start_index, end_index, algo, return_to_start)
-        elif start_index is not None:
-            order = RouteService._optimize_with_fixed_start(dist_mx, start_index, algo, return_to_start)
-        elif end_index is not None:
-            order = RouteService._optimize_with_fixed_end(dist_mx, end_index, algo, return_to_start)
+        dist = CostMatrix.of(distances)
+        dur_mx = CostMatrix.of(durations)
+        RouteService._validate_matrix(dist, dur_mx)
+
+        if use_cache:
+            # A seed, or a warm start that gets repaired, changes how the route is solved
+            repaired = None
+            if warm_start is not None and RouteService._is_small_edit(warm_start, len(places)):
+                repaired = list(warm_start)
+            cache_key = RouteCache.key(places, dist, dur_mx, algo=algo, return_to_start=return_to_start,
+                                       start_index=start_index, end_index=end_index, workers=workers,
+                                       time_limit_ms=time_limit_ms, bound=bound,
+                                       target_gap_percent=target_gap_percent, compact=compact,
+                                       seed=None if seed is None else list(seed),
+                                       warm_start=repaired)
+            cached = route_cache.get(cache_key)
+            if cached is not None:
+                cached.cached = True
+                return cached
+
+        params = dict(algo=algo, return_to_start=return_to_start, start_index=start_index, end_index=end_index,
+                      workers=workers, time_limit_ms=time_limit_ms, warm_start=warm_start, bound=bound,
+                      target_gap_percent=target_gap_percent, compact=compact, seed=seed)
+        parallel = RouteService._parallel_workers(algo, len(places), workers)
+        if not offload:
+            optimized = RouteService._compute(places, dist, dur_mx, **params)
+        elif parallel:
+            with solver_pool.reserve(parallel):
+                optimized = RouteService._compute(places, dist, dur_mx, **params)
+        else:
+            optimized = solver_pool.run(RouteService._compute, places, dist, dur_mx, **params)
+
+        if use_cache:
+            route_cache.put(cache_key, optimized)
+        return optimized
+
+    @staticmethod
+    def _compute(places: List[Place], dist: CostMatrix, dur_mx: CostMatrix, algo: Optional[str], return_to_start: bool,
+                 start_index: Optional[int], end_index: Optional[int], workers: int, time_limit_ms: Optional[int],
+                 warm_start: Optional[List[Optional[int]]], bound: bool, target_gap_percent: Optional[float],
+                 compact: bool, seed: Optional[List[int]] = None) -> Union[OptimizedRoute, CompactRoute]:
+        """Select and run the strategy for one validated request and build its response"""
+        if algo is None:
+            # Small routes are solved exactly unless a solver was asked for
+            algo = "exact" if len(places) <= EXACT_MAX_STOPS else DEFAULT_ALGO
+        elif algo == "auto":
+            algo = select_algo(len(places), start_index, end_index, return_to_start,
+                               time_limit_ms, EXACT_MAX_STOPS)
+        elif algo not in ALGOS:
+            raise ValueError(f"Unknown algo '{algo}', expected one of: {', '.join(ALGOS)}")
+        elif algo == "exact" and free_stop_count(len(places), start_index, end_index,
+                                                  return_to_start) > MAX_FREE_STOPS:
+            # Too many stops for Held-Karp; algo_used reports the substitute
+            algo = DEFAULT_ALGO
+
+        if algo != "exact" and seed is not None:
+            algo = "refine"
+        elif algo != "exact" and warm_start is not None and RouteService._is_small_edit(warm_start, len(places)):
+            algo = "incremental"
+
+        # Solvers share one dense float64 copy of the distances; durations stay compact
+        dist_mx = np.asarray(dist, dtype=float)
+
+        # Run the selected strategy within the time limit
+        budget = SolveBudget(time_limit_ms)
+        winner, bound_value, bound_ms = None, None, None
+        if bound or target_gap_percent is not None:
+            # The bound gets at most a fifth of the time limit
+            bound_value = lower_bound(dist_mx, start_index, end_index, return_to_start,
+                                      budget=SolveBudget(time_limit_ms and time_limit_ms / 5))
+            bound_ms = budget.elapsed_ms()
+            if target_gap_percent is not None:
+                budget.target_cost = bound_value * (1 + target_gap_percent / 100)
+        if algo == "refine":
+            order = local_search(list(seed), dist_mx, start_index, end_index, return_to_start, budget=budget)
+        elif algo == "incremental":
+            order = reoptimize(warm_start, dist_mx, start_index, end_index, return_to_start, budget=budget)
+        elif algo == "portfolio":
+            problem = RouteService._normalized(dist_mx, start_index, end_index, return_to_start, budget)
+            tour, winner, _ = portfolio_solve(problem.matrix, RouteService._portfolio(problem.free_stops),
+                                              problem.anchor, problem.anchor, True, budget=budget)
+            order = problem.restore(tour)
+        elif algo == "cluster":
+            coords = np.array([[p.latitude, p.longitude] for p in places])
+            order = cluster_solve(coords, dist_mx, start_index, end_index, return_to_start,
+                                  workers=workers, budget=budget)
         else:
-            order = RouteService._optimize_free_start_end(dist_mx, algo, return_to_start)
+            order = RouteService._solve(dist_mx, start_index, end_index, algo, return_to_start, workers, budget)
+        solve_ms = budget.elapsed_ms()
 
-        optimized_places = [places[i] for i in order]
-        steps, total_dist, total_time = RouteService._build_steps(order, places, dist_mx, dur_mx)
+        started = time.monotonic()
+        leg_dist, leg_time = RouteService._leg_costs(order, dist_mx, dur_mx)
+        total_dist, total_time = int(leg_dist.sum()), int(leg_time.sum())
 
-        return OptimizedRoute(
-            optimized_places=optimized_places,
+        timings = {"solve": round(solve_ms, 3)}
+        gap = None
+        if bound_value is not None:
+            timings["bound"] = round(bound_ms, 3)
+            gap = 100 * (total_dist - bound_value) / bound_value if bound_value > 0 else 0.0
+
+        summary = dict(
             visiting_order=order,
-            steps=steps,
-            total_distance=int(total_dist),
-            total_time=int(total_time),
+            total_distance=total_dist,
+            total_time=total_time,
+            iterations=budget.iterations,
+            converged=budget.converged,
+            algo_used=algo,
+            winner=winner,
+            lower_bound=None if bound_value is None else round(bound_value, 3),
+            gap_percent=None if gap is None else round(max(0.0, gap), 3),
+            timings_ms=timings,
+            cached=False,
         )
+        if compact:
+            # Every field is already of its declared type, so skip validation
+            optimized = CompactRoute.model_construct(
+                places=places,
+                leg_distances=leg_dist.tolist(),
+                leg_durations=leg_time.tolist(),
+                **summary
+            )
+        else:
+            optimized = OptimizedRoute(
+                optimized_places=[places[i] for i in order],
+                steps=RouteService._build_steps(order, places, leg_dist, leg_time),
+                **summary
+            )
+        optimized.timings_ms["build"] = round((time.monotonic() - started) * 1000, 3)
+        return optimized
 
     # ---------------- OPTIMIZATION METHODS ---------------- #
 
     @staticmethod
-    def _optimize_with_fixed_points(dist_mx: np.ndarray, start_idx: int, end_idx: int, algo: str, return_to_start: bool) -> List[int]:
-        """Optimize with both start and end points fixed"""
-        if algo == "nn":
-            return nearest_neighbor(dist_mx, start_idx, end_idx, return_to_start)
-        elif algo == "nn2opt":
-            return two_opt_optimize(dist_mx, start_idx, end_idx, return_to_start)
-        elif algo == "ga":
-            return genetic_tsp(dist_mx, start_idx, end_idx, return_to_start)
+    def _solve(dist_mx: np.ndarray, start_idx: Optional[int], end_idx: Optional[int], algo: str,
+               return_to_start: bool, workers: int, budget: SolveBudget) -> List[int]:
+        """
+        Run the solver registered for ``algo`` once, on the constraints rewritten
+        as a round trip from an anchor stop (Held-Karp takes them as they are)
+        """
+        if algo == "exact":
+            return held_karp(dist_mx, start_idx, end_idx, return_to_start, budget=budget)
+        problem = RouteService._normalized(dist_mx, start_idx, end_idx, return_to_start, budget)
+        anchor = problem.anchor
+        if algo == "ga" and workers > 1:
+            # Island model across ``workers`` processes
+            tour = island_genetic_tsp(problem.matrix, anchor, anchor, True, workers=workers, budget=budget)
+        else:
+            tour = SOLVERS[algo](problem.matrix, anchor, anchor, True, budget=budget)
+        return problem.restore(tour)
 
     @staticmethod
-    def _optimize_with_fixed_start(dist_mx: np.ndarray, start_idx: int, algo: str, return_to_start: bool) -> List[int]:
-        """Optimize with fixed start point only"""
-        if algo == "nn":
-            return nearest_neighbor(dist_mx, start_idx, None, return_to_start)
-        elif algo == "nn2opt":
-            return two_opt_optimize(dist_mx, start_idx, None, return_to_start)
-        elif algo == "ga":
-            return genetic_tsp(dist_mx, start_idx, None, return_to_start)
+    def _normalized(dist_mx: np.ndarray, start_idx: Optional[int], end_idx: Optional[int],
+                    return_to_start: bool, budget: SolveBudget) -> ClosedTourProblem:
+        """Closed-tour form of the request, with the budget's target cost moved to tour costs"""
+        problem = ClosedTourProblem(dist_mx, start_idx, end_idx, return_to_start)
+        if budget.target_cost is not None:
+            budget.target_cost -= problem.offset
+        return problem
 
     @staticmethod
-    def _optimize_with_fixed_end(dist_mx: np.ndarray, end_idx: int, algo: str, return_to_start: bool) -> List[int]:
-        """Optimize with fixed end point only"""
-        if algo == "nn":
-            return nearest_neighbor(dist_mx, None, end_idx, return_to_start)
-        elif algo == "nn2opt":
-            return two_opt_optimize(dist_mx, None, end_idx, return_to_start)
-        elif algo == "ga":
-            return genetic_tsp(dist_mx, None, end_idx, return_to_start)
+    def _parallel_workers(algo: Optional[str], n: int, workers: int) -> int:
+        """Processes of the shared parallel pool ``algo`` fans out to, 0 if it runs in one process"""
+        if algo == "portfolio":
+            return len(RouteService._portfolio(n))
+        if algo in ("ga", "cluster") and workers > 1:
+            return workers
+        return 0
 
     @staticmethod
-    def _optimize_free_start_end(dist_mx: np.ndarray, algo: str, return_to_start: bool) -> List[int]:
-        """Optimize without fixed points"""
-        if algo == "nn":
-            return nearest_neighbor(dist_mx, None, None, return_to_start)
-        elif algo == "nn2opt":
-            return two_opt_optimize(dist_mx, None, None, return_to_start)
-        elif algo == "ga":
-            return genetic_tsp(dist_mx, None, None, return_to_start)
+    def _portfolio(free_stops: int) -> dict:
+        """Solvers raced by algo=portfolio: every registered one that can handle ``free_stops`` besides the anchor"""
+        return {
+            name: solver for name, solver in SOLVERS.items()
+            # nn is dominated by nn2opt; exact only fits when few stops are free
+            if name != "nn" and (name != "exact" or free_stops <= MAX_FREE_STOPS)
+        }
 
     # ---------------- HELPERS ---------------- #
 
     @staticmethod
-    def _build_steps(order: List[int], places: List[Place], dist_mx: np.ndarray, dur_mx: np.ndarray) -> Tuple[List[RouteStep], int, int]:
+    def route_points(places: List[Place], start: Optional[Place], end: Optional[Place],
+                     return_to_start: bool) -> Tuple[List[Place], Optional[int], Optional[int]]:
+        """All points to route (start + regular places + end) with the start / end indices to pass to ``optimize``"""
+        points = ([start] if start else []) + list(places)
+        if end and end != start:
+            points.append(end)
+
+        start_idx = 0 if start else None
+        end_idx = len(points) - 1 if end and end != start else None
+        # If return_to_start is True, we need to end at the start point
+        if return_to_start and start:
+            end_idx = 0
+        return points, start_idx, end_idx
+
+    @staticmethod
+    def _is_small_edit(warm_start: List[Optional[int]], n: int) -> bool:
+        """
+        Whether ``warm_start`` differs from a full route over ``n`` places by a
+        handful of edits; an unchanged route is solved again, not repaired
+        """
+        known = {i for i in warm_start if i is not None and 0 <= i < n}
+        edits = (n - len(known)) + sum(1 for i in warm_start if i is None)
+        return len(known) >= 3 and 0 < edits <= max(2, n // 10)
+
+    @staticmethod
+    def _leg_costs(order: List[int], dist_mx: np.ndarray, dur_mx: CostMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Distance and duration of every leg of ``order``, rounded to whole meters / seconds"""
+        idx = np.asarray(order, dtype=np.intp)
+        a, b = idx[:-1], idx[1:]
+        return np.rint(dist_mx[a, b]).astype(int), np.rint(dur_mx[a, b]).astype(int)
+
+    @staticmethod
+    def _build_steps(order: List[int], places: List[Place], leg_dist: np.ndarray,
+                     leg_time: np.ndarray) -> List[RouteStep]:
         steps: List[RouteStep] = []
-        total_dist, total_time = 0, 0
 
         for i in range(len(order) - 1):
             a, b = order[i], order[i + 1]
-            d = int(round(dist_mx[a][b]))
-            t = int(round(dur_mx[a][b]))
             steps.append(RouteStep(
                 from_place=places[a],
                 to_place=places[b],
-                distance_meters=d,
-                duration_seconds=t
+                distance_meters=int(leg_dist[i]),
+                duration_seconds=int(leg_time[i])
             ))
-            total_dist += d
-            total_time += t
 
-        return steps, total_dist, total_time
+        return steps
 
     @staticmethod
-    def _validate_matrix(dist_mx: np.ndarray, dur_mx: np.ndarray):
-        if dist_mx.shape != dur_mx.shape or dist_mx.shape[0] != dist_mx.shape[1]:
+    def _validate_matrix(dist_mx: CostMatrix, dur_mx: CostMatrix):
+        # Checked on the stored values: every cell of the full matrix is among them
+        if dist_mx.shape != dur_mx.shape:
             raise ValueError("Invalid matrix shape")
-        if np.any(np.isnan(dist_mx)) or np.any(np.isnan(dur_mx)):
+        if np.any(np.isnan(dist_mx.values)) or np.any(np.isnan(dur_mx.values)):
             raise ValueError("Matrix has NaN")
-        if np.any(dist_mx < 0) or np.any(dur_mx < 0):
+        if np.any(dist_mx.values < 0) or np.any(dur_mx.values < 0):
             raise ValueError("Matrix has negative values")
@@ -0,0 +1,136 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from app.utils.exceptions import SolverBusyError, SolverUnavailableError
+
+
+class SolverPool:
+    """
+    Process pool that runs whole optimizations away from the API workers.
+
+    CPU-bound solvers hold the GIL, so running them on request threads stalls
+    every other request of the same worker. Here at most ``max_workers``
+    optimizations run at once and ``max_queue`` more wait for a process;
+    beyond that ``submit`` fails straight away with ``SolverBusyError``
+    instead of queueing without bound. The parallel solvers (portfolio,
+    islands, clusters) fan out over their own pool from the request thread;
+    ``reserve`` admits them against the same slots, one per process they use.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def submit(self, fn: Callable[..., Any], *args, block: bool = False, **kwargs) -> Future:
+        """
+        Queue ``fn(*args, **kwargs)`` on a worker process. Without ``block``,
+        raises ``SolverBusyError`` if every slot is taken; with it, waits for one.
+        """
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise SolverBusyError(f"Solver pool is full ({self.max_workers} running, {self.max_queue} queued)")
+        with self._lock:
+            self.in_flight += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._release(None)
+            self._reset()
+            raise SolverUnavailableError(f"Solver pool is unavailable: {e}") from e
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """``submit`` without blocking for a slot, then wait for the result"""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._reset()
+            raise SolverUnavailableError(f"Solver process died: {e}") from e
+
+    @contextmanager
+    def reserve(self, slots: int = 1) -> Iterator[None]:
+        """
+        Hold ``slots`` (at most ``max_workers``) for work that runs outside the
+        pool's processes; raises ``SolverBusyError`` like ``submit`` if they
+        are not all free
+        """
+        slots = min(max(1, slots), self.max_workers)
+        taken = 0
+        while taken < slots and self._slots.acquire(blocking=False):
+            taken += 1
+        if taken < slots:
+            for _ in range(taken):
+                self._slots.release()
+            with self._lock:
+                self.rejected += 1
+            raise SolverBusyError(f"Solver pool has no room for {slots} parallel workers")
+
+        with self._lock:
+            self.in_flight += slots
+        finished = False
+        try:
+            yield
+            finished = True
+        finally:
+            with self._lock:
+                self.in_flight -= slots
+                if finished:
+                    self.completed += 1
+            for _ in range(slots):
+                self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_size": self.max_queue,
+                "running": min(self.in_flight, self.max_workers),
+                "queued": max(0, self.in_flight - self.max_workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failures": self.failures,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset(self) -> None:
+        """Drop a broken executor; the next submit starts fresh processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.failures += 1
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self.completed += 1
+        self._slots.release()
@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one backend so callers can skip it while it is down.
+
+    - closed: calls go through; ``failure_threshold`` consecutive failures open it
+    - open: calls are refused immediately for ``reset_timeout`` seconds
+    - half-open: one trial call (a real request or a health probe) is let
+      through; success closes the breaker, failure opens it again
+
+    A trial that never reports back (e.g. a cancelled request) stops blocking
+    new trials after ``reset_timeout``.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the backend now; counts the refusals"""
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == CLOSED or self._claim_trial(now):
+                return True
+            self.rejected += 1
+            return False
+
+    def claim_probe(self) -> bool:
+        """
+        Take the half-open trial for a health probe if it is free; unlike
+        ``allow_request`` nothing is counted and closed breakers are left alone
+        """
+        with self._lock:
+            return self._claim_trial(time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._trial_started = None
+            self._state = CLOSED
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            self.last_error = None if error is None else str(error)
+            half_open = self._current_state(time.monotonic()) == HALF_OPEN
+            if half_open or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN or half_open:
+                    self.times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "last_error": self.last_error,
+            }
+
+    def _claim_trial(self, now: float) -> bool:
+        if self._current_state(now) != HALF_OPEN:
+            return False
+        if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+            return False
+        self._trial_started = now
+        return True
+
+    def _current_state(self, now: float) -> str:
+        # Open turns half-open by itself once the reset timeout has passed
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
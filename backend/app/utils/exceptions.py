@@ -30,4 +30,31 @@ class LLMFailedError(Exception):
     
     def get_original_exception(self) -> Exception:
         """Get the original exception that triggered this error."""
-        return self.original_exception
\ No newline at end of file
+        return self.original_exception
+
+class SolverBusyError(Exception):
+    """
+    Raised when the solver pool already has as many optimizations running and
+    queued as it accepts. The request can be retried later (HTTP 429).
+    """
+
+
+class SolverUnavailableError(Exception):
+    """
+    Raised when the solver pool cannot run work at all, e.g. after a worker
+    process died (HTTP 503). The pool is rebuilt for the next request.
+    """
+
+
+class OSRMTableTooBigError(Exception):
+    """
+    Raised when an OSRM server rejects a table request as too large (too many
+    coordinates, or a URL too long). Callers retry with smaller tiles.
+    """
+
+
+class OSRMUnavailableError(Exception):
+    """
+    Raised when no OSRM backend could serve a matrix (all failed, or their
+    circuit breakers are open). Callers may fall back to estimated costs.
+    """
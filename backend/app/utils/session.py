@@ -14,7 +14,8 @@ def get_session(session_id: str | None) -> tuple[str, Dict[str, Any]]:
                 'places': [],      # Regular places to visit
                 'start': None,     # Fixed start point (separate)
                 'end': None,       # Fixed end point (separate)
-                'last_query': {}
+                'last_query': {},
+                'last_optimized': None  # Last optimized order (place ids) for incremental re-optimization
             },
             'history': []
         }